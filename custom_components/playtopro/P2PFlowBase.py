@@ -1,39 +1,57 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 from homeassistant.const import CONF_HOST, CONF_PORT
-from homeassistant.util.network import is_ip_address
-
-from homeassistant.config_entries import ConfigEntry
-from .const import CONF_FIRMWARE, CONF_PRIVATE_KEY, CONF_SERIAL_NUMBER
-from .P2PDevice import P2PDevice, P2PError, P2PFirmwareResponse
+from homeassistant.core import HomeAssistant
+from homeassistant.util.network import is_host_valid, is_ip_address
+
+from .const import (
+    CONF_CAPABILITIES,
+    CONF_FIRMWARE,
+    CONF_PRIVATE_KEY,
+    CONF_SERIAL_NUMBER,
+    DOMAIN,
+)
+from .p2p import (
+    MIN_FIRMWARE,
+    PACKET_STATUS,
+    P2PCapabilities,
+    P2PDevice,
+    P2PError,
+    P2PFirmwareResponse,
+    P2PRequest,
+    P2PStatusResponse,
+)
+
+# Overall deadline for probing a device, both requests included
+VALIDATION_TIMEOUT = 10
 
 
 class P2PFlowBase:
     """Common helpers shared by config and options flows."""
 
+    hass: HomeAssistant
+
     async def _async_validate_input(
         self,
         errors: dict[str, str],
         host: str,
         port: int,
         serial_number: int,
-        entries: list[ConfigEntry],
     ) -> bool:
-        if is_ip_address(host):
-            match: bool = False
-
-            for entry in entries:
-                registered_serial_number: int = int(entry.data.get(CONF_SERIAL_NUMBER))
-
-                if registered_serial_number == serial_number:
-                    match = True
-                    break
-            if not match:
+        # Hostnames (including .local names) are resolved by P2PDevice
+        if is_ip_address(host) or is_host_valid(host):
+            # Entries are keyed by serial, so this is an index lookup
+            if (
+                self.hass.config_entries.async_entry_for_domain_unique_id(
+                    DOMAIN, str(serial_number)
+                )
+                is None
+            ):
                 return True
-            else:
-                errors["base"] = "device_with_serial_number_already_added"
+            errors["base"] = "device_with_serial_number_already_added"
         else:
             errors["base"] = "invalid_ip_address"
         return False
@@ -51,44 +69,67 @@ class P2PFlowBase:
         # The only request that is valid when the serial is passed as the private key
         # is get_firmware. If the device is also in setup mode, the private key will
         # be appended to the end of the packet and will be saved into the configuration.
-        hub = P2PDevice(ipv4=host, port=port, private_key=serial_number)
+        # Both probes share one connection and one deadline.
+        hub = P2PDevice(
+            host=host, port=port, private_key=serial_number, keep_alive=True
+        )
 
         try:
-            firmwareResponse: P2PFirmwareResponse = await hub.async_get_firmware()
+            async with asyncio.timeout(VALIDATION_TIMEOUT):
+                return await self._async_probe(errors, hub, host, port, serial_number)
+        except TimeoutError:
+            errors["base"] = "cannot_connect"
+            return None
+        except ConnectionError:
+            errors["base"] = "cannot_connect"
+            return None
+        except P2PError as err:
+            errors["base"] = err.error
+            return None
+        finally:
+            await hub.async_close()
+
+    async def _async_probe(
+        self,
+        errors: dict[str, str],
+        hub: P2PDevice,
+        host: str,
+        port: int,
+        serial_number: int,
+    ) -> dict[str, Any] | None:
+        firmwareResponse: P2PFirmwareResponse = await hub.async_get_firmware()
 
-            if firmwareResponse.serial_number != serial_number:
-                errors["base"] = "serial_number_mismatch"
+        if firmwareResponse.serial_number != serial_number:
+            errors["base"] = "serial_number_mismatch"
 
-            elif firmwareResponse.firmware < 28:
-                errors["base"] = "firmware_not_supported"
+        elif firmwareResponse.firmware < MIN_FIRMWARE:
+            errors["base"] = "firmware_not_supported"
 
-            elif firmwareResponse.mode == 0:
-                errors["base"] = "device_must_be_in_setup_mode_to_get_private_key"
+        elif firmwareResponse.mode == 0:
+            errors["base"] = "device_must_be_in_setup_mode_to_get_private_key"
 
-            elif firmwareResponse.private_key == 0:
-                errors["base"] = "failed_to_get_private_key"
+        elif firmwareResponse.private_key == 0:
+            errors["base"] = "failed_to_get_private_key"
 
-            else:
-                try:
-                    # Validate private key / connectivity
-                    hub = P2PDevice(
-                        ipv4=host, port=port, private_key=firmwareResponse.private_key
+        else:
+            # Validate private key / connectivity on the same connection
+            P2PStatusResponse(
+                await hub.async_get_response(
+                    P2PRequest(
+                        firmwareResponse.private_key, PACKET_STATUS, 0, bytearray()
                     )
-                    await hub.async_get_status()
-
-                    return {
-                        CONF_HOST: host,
-                        CONF_PORT: port,
-                        CONF_SERIAL_NUMBER: serial_number,
-                        CONF_PRIVATE_KEY: firmwareResponse.private_key,
-                        CONF_FIRMWARE: firmwareResponse.firmware,
-                    }
-                except P2PError as err:
-                    errors["base"] = err.error
-
-        except ConnectionError:
-            errors["base"] = "cannot_connect"
-        except P2PError as err:
-            errors["base"] = err.error
+                )
+            )
+
+            return {
+                CONF_HOST: host,
+                CONF_PORT: port,
+                CONF_SERIAL_NUMBER: serial_number,
+                CONF_PRIVATE_KEY: firmwareResponse.private_key,
+                CONF_FIRMWARE: firmwareResponse.firmware,
+                CONF_CAPABILITIES: P2PCapabilities.for_firmware(
+                    firmwareResponse.firmware
+                ).as_dict(),
+            }
 
         return None
@@ -0,0 +1,221 @@
+"""P2P raw frame recorder and replay engine."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+import struct
+import time
+
+from .p2p import (
+    DIRECTION_REQUEST,
+    DIRECTION_RESPONSE,
+    PACKET_FIRMWARE,
+    PACKET_STATUS,
+    RESPONSE_BUFFER_SIZE,
+    P2PConfirmationResponse,
+    P2PError,
+    P2PFirmwareResponse,
+    P2PResponse,
+    P2PStatusResponse,
+)
+
+TRACE_MAGIC = b"P2PT\x01"
+
+# Timestamp (s), direction, frame length, then the raw frame
+RECORD = struct.Struct("<dBH")
+
+# Traces are meant to be shared, so the private key is zeroed where it appears:
+# in place of the serial in every request, and in firmware replies sent while
+# the controller is in setup mode
+PACKET_OFFSET = 5
+REQUEST_KEY = slice(1, 5)
+FIRMWARE_KEY = slice(11, 14)
+
+TRACE_MAX_BYTES = 1024 * 1024
+TRACE_BACKUPS = 3
+FLUSH_THRESHOLD = 4096
+
+
+@dataclass(slots=True, frozen=True)
+class P2PTraceRecord:
+    """A single recorded frame."""
+
+    timestamp: float
+    direction: int
+    frame: bytes
+
+
+class P2PFrameRecorder:
+    """Appends timestamped raw frames to a size-bounded, rotating binary log."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = TRACE_MAX_BYTES,
+        backups: int = TRACE_BACKUPS,
+    ) -> None:
+        """Initialize the recorder, nothing is written until frames arrive."""
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._pending = bytearray()
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def record(self, direction: int, frame: bytes) -> None:
+        """Buffer a frame, file writes happen off the event loop in batches."""
+        self._pending += RECORD.pack(time.time(), direction, len(frame))
+        start = len(self._pending)
+        self._pending += frame
+        if direction == DIRECTION_REQUEST:
+            self._redact(start, REQUEST_KEY)
+        elif len(frame) > PACKET_OFFSET and frame[PACKET_OFFSET] == PACKET_FIRMWARE:
+            self._redact(start, FIRMWARE_KEY)
+        if len(self._pending) >= FLUSH_THRESHOLD and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self.async_flush()
+            )
+
+    def _redact(self, start: int, key: slice) -> None:
+        """Zero the key bytes of the frame buffered at start."""
+        end = min(start + key.stop, len(self._pending))
+        if start + key.start < end:
+            self._pending[start + key.start : end] = bytes(end - start - key.start)
+
+    async def async_flush(self) -> None:
+        """Write all buffered frames."""
+        async with self._lock:
+            while self._pending:
+                chunk = bytes(self._pending)
+                self._pending.clear()
+                await asyncio.to_thread(self._write, chunk)
+
+    def _write(self, chunk: bytes) -> None:
+        """Append a chunk, rotating the log first if it would grow too big."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+
+        if size and size + len(chunk) > self.max_bytes:
+            self._rotate()
+            size = 0
+
+        with self.path.open("ab") as file:
+            if size == 0:
+                file.write(TRACE_MAGIC)
+            file.write(chunk)
+
+    def _rotate(self) -> None:
+        """Shift trace -> trace.1 -> trace.2 ..., dropping the oldest."""
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else self._backup(index - 1)
+            if source.exists():
+                os.replace(source, self._backup(index))
+        if self.backups == 0:
+            self.path.unlink(missing_ok=True)
+
+    def _backup(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+
+def read_trace(path: str | Path) -> Iterator[P2PTraceRecord]:
+    """Yield the records of a trace file in order."""
+    data = Path(path).read_bytes()
+    if not data.startswith(TRACE_MAGIC):
+        raise P2PError(f"Not a P2P trace: {path}")
+
+    offset = len(TRACE_MAGIC)
+    while offset + RECORD.size <= len(data):
+        timestamp, direction, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        yield P2PTraceRecord(timestamp, direction, data[offset : offset + length])
+        offset += length
+
+
+def parse_response(frame: bytes) -> P2PResponse:
+    """Run a recorded response frame through the matching parser."""
+    buffer = bytearray(RESPONSE_BUFFER_SIZE)
+    buffer[: len(frame)] = frame
+    response = P2PResponse(buffer)
+    if response.packet == PACKET_STATUS:
+        return P2PStatusResponse(response)
+    if response.packet == PACKET_FIRMWARE:
+        return P2PFirmwareResponse(response)
+    return P2PConfirmationResponse(response, response.packet)
+
+
+@dataclass(slots=True)
+class P2PReplayReport:
+    """Timing summary of a replay."""
+
+    frames: int = 0
+    responses: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    recorded_span: float = 0.0
+    parse_times: list[float] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, float | int]:
+        """Return the summary as plain values."""
+        parse_total = sum(self.parse_times)
+        parse_mean = parse_total / len(self.parse_times) if self.parse_times else 0.0
+        return {
+            "frames": self.frames,
+            "responses": self.responses,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 6),
+            "recorded_span_s": round(self.recorded_span, 6),
+            "parse_total_ms": round(parse_total * 1000, 3),
+            "parse_mean_us": round(parse_mean * 1e6, 3),
+            "parse_max_us": round(max(self.parse_times, default=0.0) * 1e6, 3),
+        }
+
+
+async def async_replay(
+    path: str | Path,
+    speed: float = 1.0,
+    on_status: Callable[[P2PStatusResponse], None] | None = None,
+) -> P2PReplayReport:
+    """Feed a trace back through the response parsers.
+
+    A speed of 1 keeps the recorded pacing, 10 replays ten times faster and
+    0 replays as fast as possible. Parsed status frames are handed to
+    on_status, e.g. to drive a coordinator.
+    """
+    records = await asyncio.to_thread(lambda: list(read_trace(path)))
+    report = P2PReplayReport(frames=len(records))
+    if records:
+        report.recorded_span = records[-1].timestamp - records[0].timestamp
+
+    started = time.perf_counter()
+    previous: float | None = None
+
+    for record in records:
+        if record.direction != DIRECTION_RESPONSE:
+            continue
+        if speed > 0 and previous is not None:
+            await asyncio.sleep(max(record.timestamp - previous, 0.0) / speed)
+        previous = record.timestamp
+
+        parse_started = time.perf_counter()
+        try:
+            response = parse_response(record.frame)
+        except (P2PError, IndexError):
+            report.errors += 1
+            continue
+        report.parse_times.append(time.perf_counter() - parse_started)
+        report.responses += 1
+
+        if on_status is not None and isinstance(response, P2PStatusResponse):
+            on_status(response)
+
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -28,39 +28,141 @@
 from __future__ import annotations
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv
-
-from .const import DOMAIN
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    CONF_SERIAL_NUMBER,
+    CONF_ZONES,
+    DATA_PRESENCE,
+    DATA_SCHEDULER,
+    DATA_SEQUENCER,
+    DOMAIN,
+    LOGGER,
+    ZONE_COUNT,
+)
 from .coordinator import P2PDataUpdateCoordinator
-
-# NEW: import the helper functions
-from .frontend import JSModuleRegistration
+from .presence import P2PPresenceMonitor
+from .schedule import P2PScheduler
+from .sequencer import P2PRunSequencer
+from .services import async_setup_services
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SWITCH]
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up lichen playtopro from a config entry."""
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the lichen playtopro services, the scheduler and the run queue."""
+    async_setup_services(hass)
+
+    sequencer = hass.data.setdefault(DOMAIN, {})[DATA_SEQUENCER] = P2PRunSequencer(
+        hass
+    )
+    await sequencer.async_load()
+    scheduler = hass.data[DOMAIN][DATA_SCHEDULER] = P2PScheduler(hass, sequencer)
+    await scheduler.async_load()
 
-    # Register static path so /playtopro/playtopro-card.js is served
+    @callback
+    def _async_stop(_event: Event) -> None:
+        scheduler.async_stop()
+        sequencer.async_shutdown()
 
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+
+    # The card is registered once, off the setup path
+    hass.async_create_background_task(
+        _async_register_frontend(hass), f"{DOMAIN} frontend registration"
+    )
+    return True
+
+
+async def _async_register_frontend(hass: HomeAssistant) -> None:
+    """Serve the custom card and add it to the Lovelace resources."""
+    # Imported lazily, it pulls in http and lovelace
+    from .frontend import JSModuleRegistration
+
+    await JSModuleRegistration(hass).async_register()
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an old config entry."""
+    if entry.version > 1:
+        # Downgraded from a future version
+        return False
+
+    if entry.minor_version < 2:
+        # Entries from before zone detection keep the entities of every zone,
+        # with whatever names, areas and automations users gave them
+        hass.config_entries.async_update_entry(
+            entry,
+            options={
+                CONF_ZONES: [str(zone + 1) for zone in range(ZONE_COUNT)],
+                **entry.options,
+            },
+            minor_version=2,
+        )
+        LOGGER.debug("Migrated %s to version 1.2", entry.title)
+    return True
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up lichen playtopro from a config entry."""
     hass.data.setdefault(DOMAIN, {})
     entry.runtime_data = P2PDataUpdateCoordinator(hass, entry=entry)
     await entry.runtime_data.async_config_entry_first_refresh()
 
+    # Only create entities for the zones in use, detected once from the device
+    # on first setup and then managed through the options flow
+    if CONF_ZONES not in entry.options:
+        zones: list[int] = entry.runtime_data.detect_zones()
+        hass.config_entries.async_update_entry(
+            entry,
+            options={**entry.options, CONF_ZONES: [str(zone + 1) for zone in zones]},
+        )
+        entry.runtime_data.zones = zones
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Register custom cards
-    module_register = JSModuleRegistration(hass)
-    await module_register.async_register()
+    # Connection and polling changes are applied in place, without a reload
+    entry.async_on_unload(entry.add_update_listener(async_update_entry))
 
+    # Zeroconf announcements and goodbyes resume and slow down polling
+    presence: P2PPresenceMonitor | None = hass.data[DOMAIN].get(DATA_PRESENCE)
+    if presence is None:
+        presence = hass.data[DOMAIN][DATA_PRESENCE] = P2PPresenceMonitor(hass)
+        await presence.async_start()
+    presence.async_register(str(entry.data[CONF_SERIAL_NUMBER]), entry.runtime_data)
+
+    # Runs that ended while the controller was not loaded are stopped now
+    hass.data[DOMAIN][DATA_SEQUENCER].async_controller_loaded(entry.runtime_data)
     return True
 
 
+async def async_update_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Hot-swap updated entry settings onto the running coordinator."""
+    if entry.runtime_data.entity_options_changed():
+        # The set of entities changed, which needs the platforms set up again
+        hass.config_entries.async_schedule_reload(entry.entry_id)
+        return
+    await entry.runtime_data.async_reconfigure()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
+    presence: P2PPresenceMonitor | None = hass.data[DOMAIN].get(DATA_PRESENCE)
+    if presence is not None:
+        presence.async_unregister(str(entry.data[CONF_SERIAL_NUMBER]))
+        if presence.idle:
+            await presence.async_stop()
+            hass.data[DOMAIN].pop(DATA_PRESENCE)
+
+    if not hass.config_entries.async_loaded_entries(DOMAIN):
+        # Runs are kept and picked up again when a controller is set up
+        hass.data[DOMAIN][DATA_SEQUENCER].async_shutdown()
+    return True
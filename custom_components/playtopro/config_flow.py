@@ -9,21 +9,50 @@ import voluptuous as vol
 
 from homeassistant.config_entries import (
     ConfigEntry,
+    ConfigEntryState,
     ConfigFlow,
     ConfigFlowResult,
     OptionsFlow,
 )
-from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.service_info.zeroconf import ZeroconfServiceInfo
 
-from .const import CONF_FIRMWARE, CONF_SERIAL_NUMBER, DOMAIN
+from .const import (
+    CONF_COMPACT,
+    CONF_COMPACT_ZONES,
+    CONF_FIRMWARE,
+    CONF_GRACE_FAILURES,
+    CONF_GRACE_PERIOD,
+    CONF_MAX_RUNNING_ZONES,
+    CONF_NETWORK,
+    CONF_PREDICTIVE_POLLING,
+    CONF_PUSH,
+    CONF_RECORD_FRAMES,
+    CONF_SERIAL_NUMBER,
+    CONF_SITE_MAX_RUNNING_ZONES,
+    CONF_VERIFY_DELAY,
+    CONF_ZONE_MODE_SWITCHES,
+    CONF_ZONES,
+    DEFAULT_GRACE_FAILURES,
+    DEFAULT_GRACE_PERIOD,
+    DEFAULT_VERIFY_DELAY,
+    DEFAULT_PORT,
+    DOMAIN,
+    MIN_SCAN_INTERVAL,
+    SCAN_INTERVAL,
+    ZONE_COUNT,
+)
+from .discovery import P2PDiscoveredDevice, ScanRangeError, async_scan_network
 from .P2PFlowBase import P2PFlowBase
 
 _LOGGER = logging.getLogger(__name__)
 
-DEFAULT_PORT = 1233
+ZONE_OPTIONS: dict[str, str] = {
+    str(index + 1): f"Zone {(index + 1):02d}" for index in range(ZONE_COUNT)
+}
 
 OPTIONS_SCHEMA = vol.Schema(
     {
@@ -43,6 +72,10 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
     """Handle a config flow for Lichen PlayToPro."""
 
     VERSION = 1
+    # 2: zones in use are an option, detected on the first setup
+    MINOR_VERSION = 2
+
+    _scan_results: dict[str, P2PDiscoveredDevice]
 
     @staticmethod
     @callback
@@ -69,8 +102,16 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
         # 3) If already configured, update host/firmware and abort
         updates = {CONF_HOST: host, CONF_PORT: port, CONF_FIRMWARE: firmware}
 
-        # 4) This will abort if the unique_id already exists, and apply updates in the entry
-        self._abort_if_unique_id_configured(updates=updates)
+        #    An announcement also means the device is back, resume polling
+        entry = self.hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, serial_number
+        )
+        if entry is not None and entry.state is ConfigEntryState.LOADED:
+            entry.runtime_data.async_set_present(True)
+
+        # 4) This will abort if the unique_id already exists, and apply updates in the entry.
+        #    The running coordinator picks the new address up in place, no reload.
+        self._abort_if_unique_id_configured(updates=updates, reload_on_update=False)
 
         # 5) Otherwise ask user to confirm
         self._discovered_info = {
@@ -95,9 +136,7 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
             port: int = int(user_input[CONF_PORT])
             serial_number: int = int(user_input[CONF_SERIAL_NUMBER])
 
-            if await self._async_validate_input(
-                errors, host, port, serial_number, self._async_current_entries()
-            ):
+            if await self._async_validate_input(errors, host, port, serial_number):
                 # Bind this config to a stable unique_id
                 await self.async_set_unique_id(str(serial_number))
 
@@ -123,9 +162,13 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
                     vol.Required(
                         CONF_PORT, default=int(self._discovered_info[CONF_PORT])
                     ): int,
-                    vol.Required(
-                        CONF_SERIAL_NUMBER,
-                        default=int(self._discovered_info[CONF_SERIAL_NUMBER]),
+                    (
+                        vol.Required(
+                            CONF_SERIAL_NUMBER,
+                            default=int(self._discovered_info[CONF_SERIAL_NUMBER]),
+                        )
+                        if self._discovered_info[CONF_SERIAL_NUMBER] is not None
+                        else vol.Required(CONF_SERIAL_NUMBER)
                     ): int,
                 }
             ),
@@ -133,10 +176,106 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
         )
 
     # -----------------------------------------------------------------------
-    # MANUAL SETUP
+    # USER SETUP
     # -----------------------------------------------------------------------
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        return self.async_show_menu(step_id="user", menu_options=["manual", "scan"])
+
+    # -----------------------------------------------------------------------
+    # SUBNET SCAN (for networks mDNS doesn't reach)
+    # -----------------------------------------------------------------------
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            network: str = user_input[CONF_NETWORK]
+            port: int = int(user_input[CONF_PORT])
+
+            try:
+                devices = await async_scan_network(network, port)
+            except ScanRangeError:
+                errors["base"] = "invalid_network"
+            else:
+                configured = self._async_current_ids(include_ignore=False)
+                self._scan_results = {
+                    device.host: device
+                    for device in devices
+                    if str(device.serial_number) not in configured
+                }
+                if self._scan_results:
+                    return await self.async_step_pick()
+                errors["base"] = "no_devices_found"
+        else:
+            network = await self._async_default_network()
+            port = DEFAULT_PORT
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_NETWORK, default=network): str,
+                    vol.Required(CONF_PORT, default=port): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        if user_input is not None:
+            device = self._scan_results[user_input[CONF_HOST]]
+
+            if device.serial_number is not None:
+                await self.async_set_unique_id(str(device.serial_number))
+                self._abort_if_unique_id_configured()
+
+            self._discovered_info = {
+                CONF_HOST: device.host,
+                CONF_PORT: device.port,
+                CONF_SERIAL_NUMBER: device.serial_number,
+                CONF_FIRMWARE: device.firmware,
+            }
+            return await self.async_step_confirm()
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST): vol.In(
+                        {
+                            host: (
+                                f"{host} (serial {device.serial_number})"
+                                if device.serial_number is not None
+                                else host
+                            )
+                            for host, device in self._scan_results.items()
+                        }
+                    )
+                }
+            ),
+        )
+
+    async def _async_default_network(self) -> str:
+        """Suggest the /24 Home Assistant itself is on."""
+        # Imported lazily, only needed when a scan is requested
+        from homeassistant.components.network import async_get_source_ip
+
+        try:
+            source_ip: str = await async_get_source_ip(self.hass)
+        except HomeAssistantError:
+            return ""
+        return f"{source_ip.rsplit('.', 1)[0]}.0/24"
+
+    # -----------------------------------------------------------------------
+    # MANUAL SETUP
+    # -----------------------------------------------------------------------
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         errors: dict[str, str] = {}
 
@@ -145,9 +284,7 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
             port: int = int(user_input[CONF_PORT])
             serial_number: int = int(user_input[CONF_SERIAL_NUMBER])
 
-            if await self._async_validate_input(
-                errors, host, port, serial_number, self._async_current_entries()
-            ):
+            if await self._async_validate_input(errors, host, port, serial_number):
                 # Bind this config to a stable unique_id
                 await self.async_set_unique_id(str(serial_number))
 
@@ -162,7 +299,7 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
                     )
 
             return self.async_show_form(
-                step_id="user",
+                step_id="manual",
                 data_schema=vol.Schema(
                     {
                         vol.Required(CONF_HOST, default=host): str,
@@ -173,7 +310,7 @@ class P2PConfigFlow(ConfigFlow, P2PFlowBase, domain=DOMAIN):
                 errors=errors,
             )
 
-        return self.async_show_form(step_id="user", data_schema=OPTIONS_SCHEMA)
+        return self.async_show_form(step_id="manual", data_schema=OPTIONS_SCHEMA)
 
 
 # ---------------------------------------------------------------------------
@@ -197,22 +334,41 @@ class P2POptionsFlowHandler(OptionsFlow, P2PFlowBase):
             port: int = int(user_input[CONF_PORT])
             serial_number: int = int(self.entry.data[CONF_SERIAL_NUMBER])
 
-            data: dict[str, Any] | None = await self._async_validate_device(
-                errors, host, port, serial_number
-            )
+            # Only a new address needs the device (in setup mode) to be probed
+            data: dict[str, Any] | None = dict(self.entry.data)
+            if (host, port) != (self.entry.data[CONF_HOST], self.entry.data[CONF_PORT]):
+                data = await self._async_validate_device(
+                    errors, host, port, serial_number
+                )
 
             if data is not None:
-                # Update
+                options: dict[str, Any] = {
+                    **self.entry.options,
+                    CONF_SCAN_INTERVAL: user_input[CONF_SCAN_INTERVAL],
+                    CONF_PREDICTIVE_POLLING: user_input[CONF_PREDICTIVE_POLLING],
+                    CONF_ZONES: sorted(user_input[CONF_ZONES], key=int),
+                    CONF_ZONE_MODE_SWITCHES: user_input[CONF_ZONE_MODE_SWITCHES],
+                    CONF_COMPACT: user_input[CONF_COMPACT],
+                    CONF_COMPACT_ZONES: sorted(user_input[CONF_COMPACT_ZONES], key=int),
+                    CONF_GRACE_FAILURES: user_input[CONF_GRACE_FAILURES],
+                    CONF_GRACE_PERIOD: user_input[CONF_GRACE_PERIOD],
+                    CONF_VERIFY_DELAY: user_input[CONF_VERIFY_DELAY],
+                    CONF_MAX_RUNNING_ZONES: user_input[CONF_MAX_RUNNING_ZONES],
+                    CONF_SITE_MAX_RUNNING_ZONES: user_input[
+                        CONF_SITE_MAX_RUNNING_ZONES
+                    ],
+                    CONF_PUSH: user_input[CONF_PUSH],
+                    CONF_RECORD_FRAMES: user_input[CONF_RECORD_FRAMES],
+                }
+
+                # Data and options in one update, so the entry update listener
+                # runs once and applies both to the running coordinator
+                # without reloading the entities. Finishing the flow with the
+                # same options then changes nothing.
                 self.hass.config_entries.async_update_entry(
-                    entry=self.entry,
-                    data=data,
+                    entry=self.entry, data=data, options=options
                 )
-
-                # Reload
-                await self.hass.config_entries.async_reload(self.entry.entry_id)
-
-                # Return
-                return self.async_create_entry(title="", data={})
+                return self.async_create_entry(title="", data=options)
 
         return self.async_show_form(
             step_id="init",
@@ -220,6 +376,68 @@ class P2POptionsFlowHandler(OptionsFlow, P2PFlowBase):
                 {
                     vol.Required(CONF_HOST, default=self.entry.data[CONF_HOST]): str,
                     vol.Required(CONF_PORT, default=self.entry.data[CONF_PORT]): int,
+                    vol.Required(
+                        CONF_SCAN_INTERVAL,
+                        default=self.entry.options.get(
+                            CONF_SCAN_INTERVAL, int(SCAN_INTERVAL.total_seconds())
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Required(
+                        CONF_PREDICTIVE_POLLING,
+                        default=self.entry.options.get(CONF_PREDICTIVE_POLLING, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_ZONES,
+                        default=self.entry.options.get(CONF_ZONES, list(ZONE_OPTIONS)),
+                    ): cv.multi_select(ZONE_OPTIONS),
+                    vol.Required(
+                        CONF_ZONE_MODE_SWITCHES,
+                        default=self.entry.options.get(CONF_ZONE_MODE_SWITCHES, True),
+                    ): bool,
+                    vol.Required(
+                        CONF_COMPACT,
+                        default=self.entry.options.get(CONF_COMPACT, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_COMPACT_ZONES,
+                        default=self.entry.options.get(CONF_COMPACT_ZONES, []),
+                    ): cv.multi_select(ZONE_OPTIONS),
+                    vol.Required(
+                        CONF_GRACE_FAILURES,
+                        default=self.entry.options.get(
+                            CONF_GRACE_FAILURES, DEFAULT_GRACE_FAILURES
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_GRACE_PERIOD,
+                        default=self.entry.options.get(
+                            CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_VERIFY_DELAY,
+                        default=self.entry.options.get(
+                            CONF_VERIFY_DELAY, DEFAULT_VERIFY_DELAY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=30)),
+                    vol.Required(
+                        CONF_MAX_RUNNING_ZONES,
+                        default=self.entry.options.get(
+                            CONF_MAX_RUNNING_ZONES, ZONE_COUNT
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=ZONE_COUNT)),
+                    vol.Required(
+                        CONF_SITE_MAX_RUNNING_ZONES,
+                        default=self.entry.options.get(CONF_SITE_MAX_RUNNING_ZONES, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_PUSH,
+                        default=self.entry.options.get(CONF_PUSH, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_RECORD_FRAMES,
+                        default=self.entry.options.get(CONF_RECORD_FRAMES, False),
+                    ): bool,
                 }
             ),
             errors=errors,
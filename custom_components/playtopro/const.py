@@ -4,12 +4,46 @@ from datetime import timedelta
 import logging
 
 DOMAIN = "playtopro"
+DEFAULT_PORT = 1233
 CONF_SERIAL_NUMBER = "serial_number"
 CONF_FIRMWARE = "firmware"
 CONF_PRIVATE_KEY = "private_key"
+CONF_CAPABILITIES = "capabilities"
+CONF_ZONES = "zones"
+CONF_ZONE_MODE_SWITCHES = "zone_mode_switches"
+CONF_COMPACT = "compact"
+CONF_COMPACT_ZONES = "compact_zones"
+CONF_NETWORK = "network"
+CONF_RECORD_FRAMES = "record_frames"
+CONF_PUSH = "push"
+CONF_VERIFY_DELAY = "verify_delay"
+CONF_PREDICTIVE_POLLING = "predictive_polling"
+CONF_MAX_RUNNING_ZONES = "max_running_zones"
+CONF_SITE_MAX_RUNNING_ZONES = "site_max_running_zones"
+CONF_GRACE_FAILURES = "grace_failures"
+CONF_GRACE_PERIOD = "grace_period"
+DEFAULT_GRACE_FAILURES = 3
+DEFAULT_GRACE_PERIOD = 30
+DEFAULT_VERIFY_DELAY = 2
+ATTR_STALE = "stale"
+ATTR_LAST_SUCCESS = "last_success"
 LOGGER = logging.getLogger(__package__)
 SCAN_INTERVAL = timedelta(seconds=3)
+# Goodbyes can be spurious, a device that said one is still checked this often
+ABSENT_SCAN_INTERVAL = timedelta(minutes=5)
+MIN_SCAN_INTERVAL = 1
+PUSH_QUIET_TIMEOUT = 60
+PUSH_RETRY_DELAY = 30
+# Seconds a command's effect may go unconfirmed before it is given up on
+VERIFY_DEADLINE = 60
+ZONE_COUNT = 8
+RUNTIME_SAVE_DELAY = 60
 URL_BASE = "/playtopro"
+ZEROCONF_TYPE = "_playtopro._tcp.local."
+DATA_PRESENCE = "presence"
+DATA_SCHEDULER = "scheduler"
+DATA_SEQUENCER = "sequencer"
+TRACE_SUFFIX = "p2ptrace"
 
 
 JSMODULES = [
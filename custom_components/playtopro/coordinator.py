@@ -2,23 +2,83 @@
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 import copy
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_PORT
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-
-from .const import CONF_SERIAL_NUMBER, CONF_PRIVATE_KEY, DOMAIN, LOGGER, SCAN_INTERVAL
-from .P2PDevice import P2PConfirmationResponse, P2PDevice, P2PError, P2PStatusResponse
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ABSENT_SCAN_INTERVAL,
+    CONF_CAPABILITIES,
+    CONF_COMPACT,
+    CONF_COMPACT_ZONES,
+    CONF_FIRMWARE,
+    CONF_GRACE_FAILURES,
+    CONF_GRACE_PERIOD,
+    CONF_PREDICTIVE_POLLING,
+    CONF_PRIVATE_KEY,
+    CONF_PUSH,
+    CONF_RECORD_FRAMES,
+    CONF_SERIAL_NUMBER,
+    CONF_VERIFY_DELAY,
+    CONF_ZONE_MODE_SWITCHES,
+    CONF_ZONES,
+    DEFAULT_GRACE_FAILURES,
+    DEFAULT_GRACE_PERIOD,
+    DEFAULT_VERIFY_DELAY,
+    DOMAIN,
+    LOGGER,
+    PUSH_QUIET_TIMEOUT,
+    PUSH_RETRY_DELAY,
+    SCAN_INTERVAL,
+    TRACE_SUFFIX,
+    VERIFY_DEADLINE,
+    ZONE_COUNT,
+)
+from .p2p import (
+    PACKET_AUTO_MODE,
+    PACKET_ZONE_MANUAL_MODE,
+    P2PCapabilities,
+    P2PConfirmationResponse,
+    P2PDevice,
+    P2PError,
+    P2PStatus,
+    P2PStatusResponse,
+)
+from .P2PTrace import P2PFrameRecorder
+from .predictor import P2PPollPredictor
+from .runtime import P2PRuntimeTracker
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.entity import Entity
+
+    from .profiler import P2PProfiler
 
 
 class P2PDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching P2P data from single endpoint."""
 
     device: P2PDevice
-    status_response: P2PStatusResponse | None
+    status_response: P2PStatus | None
+    runtime: P2PRuntimeTracker
+    predictor: P2PPollPredictor
+    zones: list[int]
+    zone_mode_switches: bool
+    compact: bool
+    stale: bool
+    last_success: datetime | None
+    device_present: bool
+    pushing: bool
+    profiler: P2PProfiler | None
 
     def __init__(
         self,
@@ -35,35 +95,399 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
             LOGGER,
             config_entry=entry,
             name=DOMAIN,
-            update_interval=SCAN_INTERVAL,
+            update_interval=timedelta(
+                seconds=entry.options.get(
+                    CONF_SCAN_INTERVAL, SCAN_INTERVAL.total_seconds()
+                )
+            ),
         )
 
         self.status_response = None
+        self.runtime = P2PRuntimeTracker(hass, int(entry.data[CONF_SERIAL_NUMBER]))
+        self.predictor = P2PPollPredictor(hass, int(entry.data[CONF_SERIAL_NUMBER]))
+        self.zones, self.zone_mode_switches, self.compact = self._entity_options(
+            entry
+        )
+        self.stale = False
+        self.last_success = None
+        self._failures = 0
+        self.device_present = True
+        self.pushing = False
+        self.profiler = None
+        self._push_task: asyncio.Task[None] | None = None
+        self._push_frames = 0
+
+        # Flags set by accepted commands, (flag, zone or None) -> expected
+        # value and the time to give up on it, checked by one status read
+        # once the device has settled
+        self._pending: dict[tuple[str, int | None], tuple[bool, datetime]] = {}
+        self._verify_debouncer = Debouncer(
+            hass,
+            LOGGER,
+            cooldown=entry.options.get(CONF_VERIFY_DELAY, DEFAULT_VERIFY_DELAY),
+            immediate=False,
+            function=self._async_verify_commands,
+        )
+
+    @staticmethod
+    def _entity_options(entry: ConfigEntry) -> tuple[list[int], bool, bool]:
+        """Return the zone indexes, mode switch and compact settings of the entities.
+
+        In compact mode only the zones picked for it get entities of their
+        own, the controller entity carries the rest.
+        """
+        compact = bool(entry.options.get(CONF_COMPACT, False))
+        if compact:
+            selected: list[str] = entry.options.get(CONF_COMPACT_ZONES, [])
+        else:
+            selected = entry.options.get(
+                CONF_ZONES, [str(index + 1) for index in range(ZONE_COUNT)]
+            )
+        zones: list[int] = sorted(int(zone) - 1 for zone in selected)
+        return zones, bool(entry.options.get(CONF_ZONE_MODE_SWITCHES, True)), compact
+
+    def detect_zones(self) -> list[int]:
+        """Return the zones the controller has configured or has watered."""
+        mask: int = 0
+        if self.status_response is not None:
+            mask = (
+                self.status_response.actual_output
+                | self.status_response.manual_mode_zones_active
+                | self.status_response.auto_mode_zones
+                | self.status_response.eco_mode_zones
+                | self.status_response.sleep_mode_zones
+            )
+        for zone in self.runtime.zones:
+            if zone.total > 0:
+                mask |= 1 << zone.index
+
+        zones = [index for index in range(ZONE_COUNT) if (mask >> index) & 0x01]
+        # A controller with nothing configured yet keeps every zone
+        return zones or list(range(ZONE_COUNT))
+
+    def entity_options_changed(self) -> bool:
+        """Return True when the entity set no longer matches the entry options."""
+        if self.config_entry is None:
+            return False
+        return self._entity_options(self.config_entry) != (
+            self.zones,
+            self.zone_mode_switches,
+            self.compact,
+        )
 
     async def _async_setup(self):
         """Setup the coordinator."""
         self.device = P2PDevice(
-            ipv4=self.config_entry.data[CONF_HOST],
+            host=self.config_entry.data[CONF_HOST],
             port=self.config_entry.data[CONF_PORT],
             private_key=self.config_entry.data[
                 CONF_PRIVATE_KEY
             ],  # , session=async_get_clientsession(hass)
         )
+        self.device.on_capabilities_changed = self._async_capabilities_changed
+        if (cached := self.config_entry.data.get(CONF_CAPABILITIES)) is not None:
+            self.device.apply_capabilities(P2PCapabilities.from_dict(cached))
+        await self._async_negotiate()
+        await self._async_apply_recorder()
+        await self.runtime.async_load()
+        await self.predictor.async_load()
+        self._async_start_push()
+
+    async def async_shutdown(self) -> None:
+        """Flush runtime accumulators before the coordinator goes away."""
+        await super().async_shutdown()
+        self._verify_debouncer.async_shutdown()
+        if self.profiler is not None:
+            await self.profiler.async_stop()
+        if hasattr(self, "device"):
+            await self.device.async_close()
+            if self.device.recorder is not None:
+                await self.device.recorder.async_flush()
+        await self.runtime.async_import_statistics()
+        await self.runtime.async_save()
+        await self.predictor.async_save()
+
+    async def async_reconfigure(self) -> None:
+        """Apply changed connection and polling settings to the live device.
+
+        Entities stay registered, only the pooled connection is rebuilt after
+        any in-flight request completes.
+        """
+        if self.config_entry is None or not hasattr(self, "device"):
+            return
+
+        await self._async_apply_recorder()
+        self._async_start_push()
+        self._verify_debouncer.cooldown = self.config_entry.options.get(
+            CONF_VERIFY_DELAY, DEFAULT_VERIFY_DELAY
+        )
+
+        # Polling stays slow while the device is away and suspended while pushing
+        if self.device_present and not self.pushing:
+            update_interval = self._configured_update_interval()
+            if update_interval != self.update_interval:
+                self.update_interval = update_interval
+
+        host: str = self.config_entry.data[CONF_HOST]
+        port: int = int(self.config_entry.data[CONF_PORT])
+        if (host, port) != (self.device.host, self.device.port):
+            LOGGER.debug("Moving device to %s:%s", host, port)
+            await self.device.async_reconfigure(host, port)
+            await self.async_request_refresh()
+
+    @callback
+    def async_listener_entities(self) -> list[Entity]:
+        """Return the entities currently listening for updates."""
+        return [
+            update_callback.__self__
+            for update_callback, _ in self._listeners.values()
+            if hasattr(update_callback, "__self__")
+        ]
+
+    async def _async_negotiate(self) -> None:
+        """Refresh the capability profile from the controller's firmware."""
+        try:
+            capabilities = await self.device.async_negotiate(self.device.capabilities)
+        except P2PError as err:
+            # Keep whatever profile is cached, the next reconnect tries again
+            LOGGER.debug("Unable to negotiate capabilities: %s", err.error)
+            return
+        self._async_capabilities_changed(capabilities)
+
+    @callback
+    def _async_capabilities_changed(self, capabilities: P2PCapabilities) -> None:
+        """Cache a changed profile, and firmware version, in the entry."""
+        data = self.config_entry.data
+        if data.get(CONF_CAPABILITIES) == capabilities.as_dict():
+            return
+        LOGGER.debug("Capabilities of %s: %s", self.config_entry.title, capabilities)
+        if data.get(CONF_FIRMWARE) != capabilities.firmware:
+            device_registry = dr.async_get(self.hass)
+            if device := device_registry.async_get_device(
+                identifiers={(DOMAIN, int(data[CONF_SERIAL_NUMBER]))}
+            ):
+                device_registry.async_update_device(
+                    device.id, sw_version=str(capabilities.firmware)
+                )
+        self.hass.config_entries.async_update_entry(
+            self.config_entry,
+            data={
+                **data,
+                CONF_FIRMWARE: capabilities.firmware,
+                CONF_CAPABILITIES: capabilities.as_dict(),
+            },
+        )
+
+    @property
+    def trace_path(self) -> str:
+        """Return where raw frames are recorded for this device."""
+        serial_number = self.config_entry.data[CONF_SERIAL_NUMBER]
+        return self.hass.config.path(DOMAIN, f"{serial_number}.{TRACE_SUFFIX}")
+
+    async def _async_apply_recorder(self) -> None:
+        """Attach or detach the raw frame recorder to match the options."""
+        if self.config_entry.options.get(CONF_RECORD_FRAMES, False):
+            if self.device.recorder is None:
+                LOGGER.debug("Recording raw frames to %s", self.trace_path)
+                self.device.recorder = P2PFrameRecorder(self.trace_path)
+        elif (recorder := self.device.recorder) is not None:
+            self.device.recorder = None
+            await recorder.async_flush()
+
+    def _configured_update_interval(self) -> timedelta:
+        """Return the polling interval, paced by the predictor if enabled."""
+        interval = self._base_update_interval()
+        options = self.config_entry.options if self.config_entry else {}
+        if options.get(CONF_PREDICTIVE_POLLING, False):
+            return self.predictor.next_interval(
+                self.status_response,
+                dt_util.now(),
+                interval,
+                options.get(CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD),
+            )
+        return interval
+
+    def _base_update_interval(self) -> timedelta:
+        """Return the polling interval configured in the options."""
+        options = self.config_entry.options if self.config_entry else {}
+        return timedelta(
+            seconds=options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL.total_seconds())
+        )
+
+    @callback
+    def async_set_present(self, present: bool) -> None:
+        """Slow polling down when the device says goodbye, resume when it is back.
+
+        A goodbye can be spurious, an expired mDNS record for one, so a device
+        that said goodbye is still polled every ABSENT_SCAN_INTERVAL and comes
+        back as soon as it answers, without having to announce itself.
+        """
+        if present == self.device_present:
+            return
+        self.device_present = present
+
+        if present:
+            LOGGER.info("%s is back, resuming polling", self.config_entry.title)
+            self.update_interval = self._configured_update_interval()
+            self.hass.async_create_task(self.async_refresh())
+            self._async_start_push()
+        else:
+            LOGGER.info(
+                "%s said goodbye, polling every %s",
+                self.config_entry.title,
+                ABSENT_SCAN_INTERVAL,
+            )
+            self.update_interval = ABSENT_SCAN_INTERVAL
+            self.async_update_listeners()
+
+    def _push_wanted(self) -> bool:
+        """Return True if the controller should be asked to push its status."""
+        if not self.device_present:
+            return False
+        capabilities = self.device.capabilities
+        return (capabilities is not None and capabilities.push) or bool(
+            self.config_entry.options.get(CONF_PUSH, False)
+        )
+
+    @callback
+    def _async_start_push(self) -> None:
+        """Start or stop following pushed status to match the settings."""
+        running = self._push_task is not None and not self._push_task.done()
+        if self._push_wanted():
+            if not running:
+                self._push_task = self.config_entry.async_create_background_task(
+                    self.hass,
+                    self._async_push_loop(),
+                    f"playtopro push {self.config_entry.title}",
+                )
+        elif running:
+            assert self._push_task is not None
+            self._push_task.cancel()
+            self._async_set_pushing(False)
+
+    async def _async_push_loop(self) -> None:
+        """Follow pushed status frames, polling whenever the stream is down."""
+        while self._push_wanted():
+            self._push_frames = 0
+            try:
+                frames = await self.device.async_subscribe(
+                    self._async_push_status, PUSH_QUIET_TIMEOUT
+                )
+            except P2PError as err:
+                LOGGER.debug("Unable to subscribe to pushed status: %s", err.error)
+                frames = 0
+            self._async_set_pushing(False)
+
+            if frames == 1:
+                # Answered the request that opened the stream, then nothing
+                LOGGER.debug(
+                    "%s does not push status, polling instead", self.config_entry.title
+                )
+                return
+            await asyncio.sleep(PUSH_RETRY_DELAY)
+
+    @callback
+    def _async_push_status(self, response: P2PStatusResponse) -> None:
+        """Take a pushed status frame as if it had been polled."""
+        self._push_frames += 1
+        if self._push_frames == 2:
+            # A second, unsolicited frame proves the controller pushes
+            LOGGER.info("%s pushes status, polling paused", self.config_entry.title)
+            self._async_set_pushing(True)
+
+        status = self._decode_status(response)
+        self.runtime.async_update(status, dt_util.now())
+        self.predictor.async_update(status, dt_util.now())
+        self._failures = 0
+        self.stale = False
+        self.last_success = dt_util.utcnow()
+        self.async_set_status(status)
+
+    @callback
+    def _async_set_pushing(self, pushing: bool) -> None:
+        """Switch between pushed updates and polling."""
+        if pushing == self.pushing:
+            return
+        self.pushing = pushing
+        if pushing:
+            self.update_interval = None
+        elif self.device_present:
+            LOGGER.info(
+                "Pushed status from %s stopped, resuming polling",
+                self.config_entry.title,
+            )
+            self.update_interval = self._configured_update_interval()
+            self.hass.async_create_task(self.async_request_refresh())
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch data from P2PDevice ."""
         try:
-            self.status_response: P2PStatusResponse = (
+            self.status_response = self._decode_status(
                 await self.device.async_get_status()
             )
 
+            self.runtime.async_update(self.status_response, dt_util.now())
+            self.predictor.async_update(self.status_response, dt_util.now())
+
             data: dict[str, Any] = {}
             data["status"] = self.status_response
         except P2PError as e:
+            self._failures += 1
+            if self.update_interval is not None and self.device_present:
+                # Retried at the configured pace, a relaxed predicted interval
+                # could outlast the grace period before the next attempt
+                self.update_interval = self._base_update_interval()
+            if self._within_grace():
+                # Keep serving the last good status rather than flapping every
+                # entity to unavailable on a single missed poll
+                LOGGER.debug(
+                    "Serving last status after %s failed poll(s): %s",
+                    self._failures,
+                    e.error,
+                )
+                self.stale = True
+                return self.data
             raise UpdateFailed(f"Unable to update data: {e.error}") from e
         else:
+            if not self.last_update_success or self._failures:
+                # Reconnected after an outage, possibly to updated firmware
+                self.hass.async_create_task(self._async_negotiate())
+            self._failures = 0
+            self.stale = False
+            self.last_success = dt_util.utcnow()
+            if not self.device_present:
+                LOGGER.info(
+                    "%s answered after its goodbye, resuming polling",
+                    self.config_entry.title,
+                )
+                self.device_present = True
+                self._async_start_push()
+            if self.update_interval is not None:
+                # Re-paced after every poll, paused polling stays paused
+                self.update_interval = self._configured_update_interval()
             return data
 
+    def _decode_status(self, response: P2PStatusResponse) -> P2PStatus:
+        """Build the next snapshot from a status frame, numbered against the last."""
+        return P2PStatus.from_response(response).versioned(self.status_response)
+
+    @callback
+    def async_set_status(self, status: P2PStatus) -> None:
+        """Replace the status snapshot and notify entities if it changed."""
+        self.status_response = status.versioned(self.status_response)
+        self.async_set_updated_data({"status": self.status_response})
+
+    def _within_grace(self) -> bool:
+        """Return True while a failed poll may still serve the last good status."""
+        if self.data is None or self.last_success is None or self.config_entry is None:
+            return False
+
+        options = self.config_entry.options
+        if self._failures > options.get(CONF_GRACE_FAILURES, DEFAULT_GRACE_FAILURES):
+            return False
+        age: float = (dt_util.utcnow() - self.last_success).total_seconds()
+        return age <= options.get(CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD)
+
     async def async_set_zone_manual_mode(self, zone: int, state: bool) -> bool:
         """Set zone manual mode."""
         try:
@@ -73,13 +497,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response is not None:
-                    self.status_response.zones[zone].manual_mode_active = state
-                    self.async_set_updated_data({"status": self.status_response})
-
-                # Always reconcile with device truth
-                self.async_request_refresh()
-
+                self._async_command_accepted({("manual_mode_active", zone): state})
                 return True
             return False
 
@@ -97,9 +515,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response:
-                    self.status_response.system_auto = state
-                    self.async_set_updated_data({"status": self.status_response})
+                self._async_command_accepted({("system_auto", None): state})
                 return True
             return False
 
@@ -117,9 +533,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response:
-                    self.status_response.zones[zone].auto_mode = state
-                    self.async_set_updated_data({"status": self.status_response})
+                self._async_command_accepted({("auto_mode", zone): state})
                 return True
             return False
 
@@ -137,9 +551,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response:
-                    self.status_response.eco_mode = state
-                    self.async_set_updated_data({"status": self.status_response})
+                self._async_command_accepted({("eco_mode", None): state})
                 return True
             return False
 
@@ -157,9 +569,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response:
-                    self.status_response.zones[zone].eco_mode = state
-                    self.async_set_updated_data({"status": self.status_response})
+                self._async_command_accepted({("eco_mode", zone): state})
                 return True
             return False
 
@@ -177,9 +587,7 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Check the result and update the stored status for the device
             if response.result:
-                if self.status_response:
-                    self.status_response.zones[zone].sleep_mode = state
-                    self.async_set_updated_data({"status": self.status_response})
+                self._async_command_accepted({("sleep_mode", zone): state})
                 return True
             return False
 
@@ -187,3 +595,99 @@ class P2PDataUpdateCoordinator(DataUpdateCoordinator):
             raise UpdateFailed(f"Unable to set zone sleep mode: {error}") from error
         else:
             return response.result
+
+    async def async_stop_all(self) -> bool:
+        """Turn off auto mode and every zone in one pipelined batch.
+
+        Auto mode goes first so the controller can't restart a program, then
+        manual mode is cleared on all zones, configured in HA or not.
+        """
+        commands: list[tuple[int, int, bool]] = [(PACKET_AUTO_MODE, 0, False)]
+        commands.extend(
+            (PACKET_ZONE_MANUAL_MODE, zone, False) for zone in range(ZONE_COUNT)
+        )
+
+        try:
+            responses: list[P2PConfirmationResponse] = (
+                await self.device.async_send_commands(commands)
+            )
+        except P2PError as error:
+            raise UpdateFailed(f"Unable to stop all: {error.error}") from error
+        result = all(response.result for response in responses)
+
+        if result:
+            expected: dict[tuple[str, int | None], bool] = {
+                ("system_auto", None): False
+            }
+            expected.update(
+                (("manual_mode_active", zone), False) for zone in range(ZONE_COUNT)
+            )
+            self._async_command_accepted(expected)
+        else:
+            self._verify_debouncer.async_schedule_call()
+        return result
+
+    @callback
+    def _async_command_accepted(
+        self, expected: dict[tuple[str, int | None], bool]
+    ) -> None:
+        """Show an accepted command's effect now and queue its verification.
+
+        Commands within one settle delay share a single status read.
+        """
+        if (status := self.status_response) is not None:
+            for (flag, zone), value in expected.items():
+                if zone is None:
+                    status = replace(status, **{flag: value})
+                else:
+                    status = status.with_zone(zone, **{flag: value})
+            self.async_set_status(status)
+        deadline = dt_util.utcnow() + timedelta(seconds=VERIFY_DEADLINE)
+        self._pending.update(
+            (key, (value, deadline)) for key, value in expected.items()
+        )
+        self._verify_debouncer.async_schedule_call()
+
+    async def _async_verify_commands(self) -> None:
+        """Read the status back and report flags that did not take.
+
+        The read replaces the optimistic snapshot, which rolls back every
+        flag the device did not actually change.
+        """
+        pending, self._pending = self._pending, {}
+        await self.async_refresh()
+
+        status = self.status_response
+        if not self.last_update_success or self.stale or status is None:
+            # Kept until a read confirms or rejects them, newer commands for
+            # the same flag win
+            now = dt_util.utcnow()
+            for (flag, zone), (value, deadline) in pending.items():
+                if deadline > now:
+                    self._pending.setdefault((flag, zone), (value, deadline))
+                    continue
+                LOGGER.warning(
+                    "Unable to confirm %s%s=%s on %s, the device did not answer",
+                    flag,
+                    "" if zone is None else f" on zone {zone + 1}",
+                    value,
+                    self.config_entry.title,
+                )
+            if self._pending:
+                self._verify_debouncer.async_schedule_call()
+            return
+
+        for (flag, zone), (value, _) in pending.items():
+            actual: bool = (
+                getattr(status, flag)
+                if zone is None
+                else getattr(status.zones[zone], flag)
+            )
+            if actual != value:
+                LOGGER.warning(
+                    "%s did not apply %s%s=%s, rolled back to the reported state",
+                    self.config_entry.title,
+                    flag,
+                    "" if zone is None else f" on zone {zone + 1}",
+                    value,
+                )
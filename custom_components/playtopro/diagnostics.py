@@ -0,0 +1,44 @@
+"""Diagnostics support for P2P devices."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_PRIVATE_KEY
+from .coordinator import P2PDataUpdateCoordinator
+
+TO_REDACT = {CONF_HOST, CONF_PRIVATE_KEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: P2PDataUpdateCoordinator = entry.runtime_data
+    device = coordinator.device
+    status = coordinator.status_response
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "capabilities": (
+            device.capabilities.as_dict() if device.capabilities is not None else None
+        ),
+        "retries": device.retry_stats.as_dict(),
+        "predictor": coordinator.predictor.as_dict(),
+        "device_present": coordinator.device_present,
+        "pushing": coordinator.pushing,
+        "stale": coordinator.stale,
+        "last_success": (
+            coordinator.last_success.isoformat() if coordinator.last_success else None
+        ),
+        "status": asdict(status) if status is not None else None,
+    }
@@ -0,0 +1,88 @@
+"""Subnet scanner for lichen play controllers that mDNS can't reach."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import ipaddress
+
+from .const import DEFAULT_PORT, LOGGER
+from .p2p import P2PDevice, P2PError, P2PFirmwareResponse, P2PNoReplyError
+
+SCAN_CONCURRENCY = 64
+SCAN_TIMEOUT = 0.5
+
+# Larger ranges are refused, a /22 is already ~1000 probes
+MAX_SCAN_HOSTS = 1024
+
+
+@dataclass(slots=True)
+class P2PDiscoveredDevice:
+    """A controller found by a subnet scan."""
+
+    host: str
+    port: int
+    serial_number: int | None = None
+    firmware: int | None = None
+
+
+class ScanRangeError(ValueError):
+    """The requested network is invalid or too large to scan."""
+
+
+async def async_scan_network(
+    network: str,
+    port: int = DEFAULT_PORT,
+    *,
+    concurrency: int = SCAN_CONCURRENCY,
+    timeout: float = SCAN_TIMEOUT,
+) -> list[P2PDiscoveredDevice]:
+    """Probe every host in a CIDR range with the firmware packet.
+
+    Hosts answering with a firmware frame report their serial number. Hosts
+    that accept the connection but close it without answering are returned
+    as candidates without a serial, the user has to supply it.
+    """
+    try:
+        hosts = list(ipaddress.IPv4Network(network, strict=False).hosts())
+    except ValueError as err:
+        raise ScanRangeError(f"Invalid network: {network}") from err
+    if len(hosts) > MAX_SCAN_HOSTS:
+        raise ScanRangeError(f"Network too large to scan: {network}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _async_probe_host(host: str) -> P2PDiscoveredDevice | None:
+        async with semaphore:
+            return await async_probe(host, port, timeout)
+
+    results = await asyncio.gather(*(_async_probe_host(str(host)) for host in hosts))
+    devices = [device for device in results if device is not None]
+    LOGGER.debug("Scanned %s hosts in %s, found %s", len(hosts), network, devices)
+    return devices
+
+
+async def async_probe(
+    host: str, port: int = DEFAULT_PORT, timeout: float = SCAN_TIMEOUT
+) -> P2PDiscoveredDevice | None:
+    """Identify a single host, returning None when nothing is listening.
+
+    A scan doesn't know the serial numbers it is looking for, and firmware
+    requests are normally keyed with the serial, so the probe goes out under
+    key 0 on purpose. A controller that answers it anyway identifies itself.
+    One that wants its own key closes the connection without a reply, which
+    is taken as a controller being there; the user then enters the serial.
+    """
+    device = P2PDevice(host=host, port=port, private_key=0, timeout=timeout)
+
+    try:
+        response: P2PFirmwareResponse = await device.async_get_firmware()
+    except P2PNoReplyError:
+        # Listening on the P2P port, but would not identify itself
+        return P2PDiscoveredDevice(host, port)
+    except P2PError:
+        return None
+    finally:
+        await device.async_close()
+
+    return P2PDiscoveredDevice(host, port, response.serial_number, response.firmware)
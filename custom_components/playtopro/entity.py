@@ -1,14 +1,38 @@
 """Base class for P2P entities."""
 
+from collections.abc import Iterable
+from datetime import datetime
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import CONF_FIRMWARE, DOMAIN
+from .const import ATTR_LAST_SUCCESS, ATTR_STALE, CONF_FIRMWARE, DOMAIN
 from .coordinator import CONF_SERIAL_NUMBER, P2PDataUpdateCoordinator
 
 
 class P2PEntity(CoordinatorEntity[P2PDataUpdateCoordinator]):
-    """Defines a base P2P entity."""
+    """Defines a base P2P entity.
+
+    State writes go through _async_write_state, which drops writes that
+    would not change what the recorder stores and, for entities that set
+    _write_interval, holds back changes to at most one write per interval.
+    """
+
+    # The stale flag changes with every failed poll, keep it out of history
+    _unrecorded_attributes = frozenset({ATTR_STALE, ATTR_LAST_SUCCESS})
+    # Minimum seconds between writes of a changed value, 0 writes every change
+    _write_interval: float = 0
+
+    _written: tuple[Any, ...] | None = None
+    _shown: tuple[Any, ...] | None = None
+    _last_write: float = 0.0
+    _unsub_write: CALLBACK_TYPE | None = None
 
     def __init__(self, coordinator: P2PDataUpdateCoordinator) -> None:
         """Initialize P2P entity."""
@@ -29,3 +53,101 @@ class P2PEntity(CoordinatorEntity[P2PDataUpdateCoordinator]):
                 sw_version=str(firmware),
                 serial_number=str(serial_number),
             )
+
+    @property
+    def available(self) -> bool:
+        """Return False while the device is announced as gone."""
+        return super().available and self.coordinator.device_present
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Flag entities while the coordinator serves a stale status."""
+        if self.coordinator.stale and self.coordinator.last_success is not None:
+            return {
+                ATTR_STALE: True,
+                ATTR_LAST_SUCCESS: self.coordinator.last_success.isoformat(),
+            }
+        return None
+
+    @callback
+    def _async_status_changed(self, *extra: Any) -> bool:
+        """Return True if anything shown may have changed since the last write.
+
+        Snapshots are immutable and versioned, so this is a tuple compare
+        rather than a field by field one. Entities showing more than the
+        status pass those values as extra.
+        """
+        status = (self.coordinator.data or {}).get("status")
+        written = (
+            status.version if status is not None else None,
+            self.coordinator.last_update_success,
+            self.coordinator.stale,
+            self.coordinator.device_present,
+            *extra,
+        )
+        if written == self._written:
+            return False
+        self._written = written
+        return True
+
+    @callback
+    def _async_write_state(self) -> None:
+        """Write the state if what is shown changed, at most once per interval."""
+        shown = (self.available, self.state, self.extra_state_attributes)
+        if shown == self._shown:
+            return
+
+        now = time.monotonic()
+        if (
+            self._write_interval
+            and self._shown is not None
+            and shown[0] == self._shown[0]
+        ):
+            # Availability changes are always written straight away
+            if (wait := self._last_write + self._write_interval - now) > 0:
+                if self._unsub_write is None:
+                    self._unsub_write = async_call_later(
+                        self.hass, wait, self._async_write_deferred
+                    )
+                return
+
+        self._async_cancel_write()
+        self._shown = shown
+        self._last_write = now
+        self.async_write_ha_state()
+
+    @callback
+    def _async_write_deferred(self, _now: datetime) -> None:
+        self._unsub_write = None
+        self._async_write_state()
+
+    @callback
+    def _async_cancel_write(self) -> None:
+        if self._unsub_write is not None:
+            self._unsub_write()
+            self._unsub_write = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop a held back write."""
+        await super().async_will_remove_from_hass()
+        self._async_cancel_write()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if self._async_status_changed():
+            self._async_write_state()
+
+
+@callback
+def async_remove_stale_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    domain: str,
+    unique_ids: Iterable[str],
+) -> None:
+    """Remove registry entries for entities the platform no longer creates."""
+    registry = er.async_get(hass)
+    keep = set(unique_ids)
+    for entity_entry in er.async_entries_for_config_entry(registry, entry.entry_id):
+        if entity_entry.domain == domain and entity_entry.unique_id not in keep:
+            registry.async_remove(entity_entry.entity_id)
@@ -0,0 +1,91 @@
+"""Async client for the lichen play P2P protocol.
+
+Nothing here depends on Home Assistant, so tools and scripts can import
+the client on its own, as the top level ``p2p`` package with the
+integration directory on sys.path. Importing it as
+``custom_components.playtopro.p2p`` runs the integration's __init__
+first, which needs Home Assistant. The integration maps these errors to
+Home Assistant ones in the coordinator.
+"""
+
+from .device import (
+    DIRECTION_REQUEST,
+    DIRECTION_RESPONSE,
+    MIN_FIRMWARE,
+    PACKET_AUTO_MODE,
+    PACKET_ECO_MODE,
+    PACKET_FIRMWARE,
+    PACKET_STATUS,
+    PACKET_ZONE_AUTO_MODE,
+    PACKET_ZONE_ECO_MODE,
+    PACKET_ZONE_MANUAL_MODE,
+    PACKET_ZONE_SLEEP_MODE,
+    RESPONSE_BUFFER_SIZE,
+    P2PAutoModeRequest,
+    P2PCapabilities,
+    P2PConfirmationResponse,
+    P2PDevice,
+    P2PEcoModeRequest,
+    P2PFirmwareResponse,
+    P2PRecorder,
+    P2PRequest,
+    P2PResponse,
+    P2PRetryStats,
+    P2PStatus,
+    P2PStatusResponse,
+    P2PZone,
+    P2PZoneAutoModeRequest,
+    P2PZoneEcoModeRequest,
+    P2PZoneManualModeRequest,
+    P2PZoneSleepModeRequest,
+)
+from .exceptions import (
+    DeviceNotFoundError,
+    InvalidPrivateKeyError,
+    P2PConnectionError,
+    P2PError,
+    P2PNoReplyError,
+    P2PProtocolError,
+    P2PRequestError,
+    P2PTimeoutError,
+)
+
+__all__ = [
+    "DIRECTION_REQUEST",
+    "DIRECTION_RESPONSE",
+    "MIN_FIRMWARE",
+    "PACKET_AUTO_MODE",
+    "PACKET_ECO_MODE",
+    "PACKET_FIRMWARE",
+    "PACKET_STATUS",
+    "PACKET_ZONE_AUTO_MODE",
+    "PACKET_ZONE_ECO_MODE",
+    "PACKET_ZONE_MANUAL_MODE",
+    "PACKET_ZONE_SLEEP_MODE",
+    "RESPONSE_BUFFER_SIZE",
+    "DeviceNotFoundError",
+    "InvalidPrivateKeyError",
+    "P2PAutoModeRequest",
+    "P2PCapabilities",
+    "P2PConfirmationResponse",
+    "P2PConnectionError",
+    "P2PDevice",
+    "P2PEcoModeRequest",
+    "P2PError",
+    "P2PFirmwareResponse",
+    "P2PNoReplyError",
+    "P2PProtocolError",
+    "P2PRecorder",
+    "P2PRequest",
+    "P2PRequestError",
+    "P2PResponse",
+    "P2PRetryStats",
+    "P2PStatus",
+    "P2PStatusResponse",
+    "P2PTimeoutError",
+    "P2PZone",
+    "P2PZoneAutoModeRequest",
+    "P2PZoneEcoModeRequest",
+    "P2PZoneManualModeRequest",
+    "P2PZoneSleepModeRequest",
+]
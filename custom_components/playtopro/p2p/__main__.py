@@ -0,0 +1,7 @@
+"""Run the fleet tool with ``python -m p2p``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,363 @@
+"""Command line tool for working with a fleet of controllers.
+
+Run it from the integration directory as ``python -m p2p``. Controllers
+come from ``--host`` or a fleet file, either CSV lines of
+``host[:port],serial[,key]`` or a JSON list of objects with the same keys.
+The key defaults to the serial number.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+import csv
+from dataclasses import dataclass
+import json
+import math
+from pathlib import Path
+import statistics
+import sys
+import time
+from typing import Any
+
+from .device import REQUEST_TIMEOUT, P2PDevice, P2PStatus
+from .exceptions import P2PError
+
+# Port controllers listen on unless configured otherwise
+DEFAULT_PORT = 1233
+
+FORMAT_JSON = "json"
+FORMAT_TABLE = "table"
+
+DEFAULT_WORKERS = 8
+DEFAULT_ITERATIONS = 20
+
+MODES = ("manual", "auto", "eco", "sleep")
+# Modes that exist for the whole controller as well as per zone
+CONTROLLER_MODES = ("auto", "eco")
+
+
+@dataclass(slots=True, frozen=True)
+class P2PTarget:
+    """A controller to talk to."""
+
+    host: str
+    port: int
+    serial_number: int
+    private_key: int
+
+    @classmethod
+    def parse(
+        cls, address: str, serial_number: int | str, key: int | str | None = None
+    ) -> P2PTarget:
+        """Build a target from a host[:port], a serial and an optional key."""
+        host, _, port = address.strip().partition(":")
+        serial = int(serial_number)
+        return cls(
+            host=host,
+            port=int(port) if port else DEFAULT_PORT,
+            serial_number=serial,
+            private_key=int(key) if key not in (None, "") else serial,
+        )
+
+    def device(self, timeout: float, *, keep_alive: bool = False) -> P2PDevice:
+        """Return a client for this controller."""
+        return P2PDevice(
+            self.host,
+            self.port,
+            self.private_key,
+            keep_alive=keep_alive,
+            timeout=timeout,
+        )
+
+
+def load_fleet(path: Path) -> list[P2PTarget]:
+    """Read controllers from a CSV or JSON fleet file."""
+    text = path.read_text()
+    if path.suffix == ".json":
+        return [
+            P2PTarget.parse(
+                f"{entry['host']}:{entry.get('port', DEFAULT_PORT)}",
+                entry["serial"],
+                entry.get("key"),
+            )
+            for entry in json.loads(text)
+        ]
+    return [
+        P2PTarget.parse(*row[:3])
+        for row in csv.reader(text.splitlines())
+        if row and not row[0].lstrip().startswith("#")
+    ]
+
+
+async def async_status(target: P2PTarget, args: argparse.Namespace) -> dict[str, Any]:
+    """Read a controller's status."""
+    device = target.device(args.timeout)
+    try:
+        status = P2PStatus.from_response(await device.async_get_status())
+    finally:
+        await device.async_close()
+    clock = status.clock
+    return {
+        "auto": status.system_auto,
+        "eco": status.eco_mode,
+        "eco_factor": status.eco_mode_factor,
+        "watering": _zones(status.actual_output),
+        "manual": _zones(status.manual_mode_zones_active),
+        "auto_zones": _zones(status.auto_mode_zones),
+        "sleep_zones": _zones(status.sleep_mode_zones),
+        "clock": clock.isoformat() if clock is not None else None,
+    }
+
+
+async def async_firmware(target: P2PTarget, args: argparse.Namespace) -> dict[str, Any]:
+    """Read a controller's firmware version."""
+    device = target.device(args.timeout)
+    try:
+        response = await device.async_get_firmware()
+    finally:
+        await device.async_close()
+    return {"firmware": response.firmware, "mode": response.mode}
+
+
+async def async_set(target: P2PTarget, args: argparse.Namespace) -> dict[str, Any]:
+    """Switch a zone or controller mode."""
+    device = target.device(args.timeout)
+    state: bool = args.state == "on"
+    try:
+        if args.zone is None:
+            if args.mode == "auto":
+                response = await device.async_set_auto_mode(state)
+            else:
+                response = await device.async_set_eco_mode(state)
+        else:
+            zone: int = args.zone - 1
+            setter = {
+                "manual": device.async_set_zone_manual_mode,
+                "auto": device.async_set_zone_auto_mode,
+                "eco": device.async_set_zone_eco_mode,
+                "sleep": device.async_set_zone_sleep_mode,
+            }[args.mode]
+            response = await setter(zone, state)
+    finally:
+        await device.async_close()
+    if not response.result:
+        raise P2PError("Refused")
+    return {"mode": args.mode, "zone": args.zone, "state": args.state}
+
+
+async def async_bench(target: P2PTarget, args: argparse.Namespace) -> dict[str, Any]:
+    """Time TCP connects and status round trips over a number of iterations."""
+    connects: list[float] = []
+    failed_connects = 0
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(target.host, target.port), args.timeout
+            )
+        except (OSError, TimeoutError):
+            failed_connects += 1
+            continue
+        connects.append(time.perf_counter() - started)
+        writer.close()
+
+    # Round trips on one kept-open connection, after a first request opens it
+    device = target.device(args.timeout, keep_alive=True)
+    round_trips: list[float] = []
+    failed_requests = 0
+    try:
+        await device.async_get_status()
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            try:
+                await device.async_get_status()
+            except P2PError:
+                failed_requests += 1
+                continue
+            round_trips.append(time.perf_counter() - started)
+    finally:
+        await device.async_close()
+
+    return {
+        "connect": _distribution(connects, failed_connects),
+        "rtt": _distribution(round_trips, failed_requests),
+    }
+
+
+def _zones(mask: int) -> list[int]:
+    return [zone + 1 for zone in range(8) if mask >> zone & 0x01]
+
+
+def _distribution(samples: Sequence[float], failed: int) -> dict[str, Any]:
+    """Summarize timings in milliseconds."""
+    if not samples:
+        return {"count": 0, "failed": failed}
+    ordered = sorted(sample * 1000 for sample in samples)
+    return {
+        "count": len(ordered),
+        "failed": failed,
+        "min_ms": round(ordered[0], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(statistics.median(ordered), 2),
+        # Nearest rank, the smallest sample at or above 95% of them
+        "p95_ms": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def async_run(
+    targets: Sequence[P2PTarget],
+    command: Callable[[P2PTarget, argparse.Namespace], Awaitable[dict[str, Any]]],
+    args: argparse.Namespace,
+) -> list[dict[str, Any]]:
+    """Run a command against every target, at most args.workers at a time."""
+    semaphore = asyncio.Semaphore(args.workers)
+
+    async def _async_one(target: P2PTarget) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "serial": target.serial_number,
+            "host": f"{target.host}:{target.port}",
+        }
+        async with semaphore:
+            # Timed from when a worker picks it up, not while it waits
+            started = time.perf_counter()
+            try:
+                result.update(await command(target, args), ok=True)
+            except P2PError as err:
+                result.update(ok=False, error=err.error)
+            except Exception as err:
+                # One bad controller must not abort the rest of the fleet
+                result.update(ok=False, error=repr(err))
+            result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    return await asyncio.gather(*(_async_one(target) for target in targets))
+
+
+def format_table(results: Sequence[dict[str, Any]]) -> str:
+    """Lay results out as aligned columns, nested values as JSON."""
+    columns: list[str] = []
+    for result in results:
+        columns.extend(key for key in result if key not in columns)
+
+    def _cell(value: Any) -> str:
+        if value is None:
+            return "-"
+        if isinstance(value, dict | list):
+            return json.dumps(value, separators=(",", ":"))
+        return str(value)
+
+    rows = [[_cell(result.get(column)) for column in columns] for result in results]
+    widths = [
+        max(len(column), *(len(row[index]) for row in rows))
+        for index, column in enumerate(columns)
+    ]
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths, strict=True))
+        for row in [columns, ["-" * width for width in widths], *rows]
+    ]
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="python -m p2p",
+        description="Query, control and benchmark lichen play controllers.",
+    )
+    parser.add_argument(
+        "--fleet", type=Path, help="CSV or JSON file listing the controllers"
+    )
+    parser.add_argument(
+        "--host",
+        action="append",
+        default=[],
+        metavar="HOST[:PORT],SERIAL[,KEY]",
+        help="a controller, may be repeated",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="controllers worked on at once (default %(default)s)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=REQUEST_TIMEOUT,
+        help="seconds to wait for each request (default %(default)s)",
+    )
+    parser.add_argument(
+        "--format", choices=(FORMAT_TABLE, FORMAT_JSON), default=FORMAT_TABLE
+    )
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="read the status of each controller")
+    commands.add_parser("firmware", help="read the firmware of each controller")
+
+    set_parser = commands.add_parser("set", help="switch a zone or controller mode")
+    set_parser.add_argument("mode", choices=MODES)
+    set_parser.add_argument("state", choices=("on", "off"))
+    set_parser.add_argument(
+        "--zone",
+        type=int,
+        choices=range(1, 9),
+        help="zone to switch, leave out for the controller's auto or eco mode",
+    )
+
+    bench_parser = commands.add_parser(
+        "bench", help="measure connect and round trip times"
+    )
+    bench_parser.add_argument(
+        "--iterations",
+        type=int,
+        default=DEFAULT_ITERATIONS,
+        help="samples per controller (default %(default)s)",
+    )
+    return parser
+
+
+COMMANDS: dict[
+    str, Callable[[P2PTarget, argparse.Namespace], Awaitable[dict[str, Any]]]
+] = {
+    "status": async_status,
+    "firmware": async_firmware,
+    "set": async_set,
+    "bench": async_bench,
+}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the tool, returning 1 if any controller failed."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        targets = [P2PTarget.parse(*value.split(",")[:3]) for value in args.host]
+        if args.fleet is not None:
+            targets.extend(load_fleet(args.fleet))
+    except (OSError, ValueError, TypeError, KeyError) as err:
+        parser.error(f"invalid controller list: {err}")
+    if not targets:
+        parser.error("no controllers, use --host or --fleet")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (
+        args.command == "set"
+        and args.zone is None
+        and args.mode not in CONTROLLER_MODES
+    ):
+        parser.error(f"{args.mode} mode needs a --zone")
+
+    results = asyncio.run(async_run(targets, COMMANDS[args.command], args))
+    if args.format == FORMAT_JSON:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results))
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
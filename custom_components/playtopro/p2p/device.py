@@ -0,0 +1,1105 @@
+"""P2P Connection Hub."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime
+import ipaddress
+import random
+import socket
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Protocol, TypeVar
+
+from .exceptions import (
+    P2PConnectionError,
+    P2PError,
+    P2PNoReplyError,
+    P2PProtocolError,
+    P2PRequestError,
+    P2PTimeoutError,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+PACKET_FIRMWARE = 0
+PACKET_STATUS = 1
+PACKET_AUTO_MODE = 5
+PACKET_ZONE_AUTO_MODE = 6
+PACKET_ZONE_MANUAL_MODE = 7
+PACKET_ECO_MODE = 8
+PACKET_ZONE_ECO_MODE = 9
+PACKET_ZONE_SLEEP_MODE = 14
+
+# Header (1), serial (4), packet (1), counter (1), length (1), payload, "!" (1)
+PACKET_LENGTH_OFFSET = 7
+FRAME_HEADER_SIZE = 8
+RESPONSE_BUFFER_SIZE = 100
+
+# Frame directions as seen by a recorder
+DIRECTION_REQUEST = 0
+DIRECTION_RESPONSE = 1
+REQUEST_TIMEOUT = 5.0
+
+# getaddrinfo doesn't expose record TTLs, so resolved names are kept for a
+# fixed time and re-resolved early whenever a connection attempt fails
+DNS_CACHE_TTL = 300.0
+
+ZONES = range(8)
+
+# Oldest firmware the integration can talk to
+MIN_FIRMWARE = 28
+
+# Dropped pooled connections in a row before keep-alive is given up on
+KEEP_ALIVE_DROPS = 3
+
+# Time an idempotent command may take, retries included
+COMMAND_DEADLINE = 10.0
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 2.0
+# A controller that keeps answering out of step likely has another key
+PROTOCOL_RETRIES = 1
+
+RETRY_KINDS = ("connection", "timeout", "protocol")
+
+_T = TypeVar("_T")
+
+# Zone flag -> the status bit mask it is decoded from
+ZONE_MASKS: dict[str, str] = {
+    "on": "actual_output",
+    "auto_mode": "auto_mode_zones",
+    "eco_mode": "eco_mode_zones",
+    "sleep_mode": "sleep_mode_zones",
+    "manual_mode_active": "manual_mode_zones_active",
+    "eco_mode_active": "eco_mode_zones_active",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class P2PZone:
+    """Defines an irrigation zone."""
+
+    index: int
+    on: bool = False
+    auto_mode: bool = False
+    eco_mode: bool = False
+    sleep_mode: bool = False
+    manual_mode_active: bool = False
+    eco_mode_active: bool = False
+
+    @classmethod
+    def from_masks(cls, index: int, masks: Mapping[str, int]) -> P2PZone:
+        """Build a zone from the status bit masks."""
+        return cls(
+            index,
+            **{
+                flag: bool((masks[mask] >> index) & 0x01)
+                for flag, mask in ZONE_MASKS.items()
+            },
+        )
+
+
+class P2PRequest:
+    """Defines a request packet."""
+
+    serial_number: int
+    header: int
+    packet: int
+    length: int
+    packet_counter: int
+    data: bytearray
+
+    def __init__(
+        self, serial_number: int, packet: int, length: int, data: bytearray
+    ) -> None:
+        """Initialize the Request for use."""
+        self.header = ord("$")
+        self.serial_number = serial_number
+        self.packet = packet
+        self.packet_counter = 0
+        self.length = length
+        self.data = bytearray(self.length)
+        if self.length > 0:
+            self.data = data[0 : self.length]
+        else:
+            self.data = bytearray()
+
+    def toBytes(self) -> bytearray:
+        """Converts a request to a byte array ready for sending."""
+        output: bytearray = bytearray()
+        output = output + self.header.to_bytes(1, "little")
+        output = output + self.serial_number.to_bytes(4, "little")
+        output = output + self.packet.to_bytes(1, "little")
+        output = output + self.packet_counter.to_bytes(1, "little")
+        output = output + self.length.to_bytes(1, "little")
+        if self.length > 0:
+            output = output + self.data[0 : self.length]
+        return output + b"!"
+
+
+class P2PZoneManualModeRequest(P2PRequest):
+    """Defines a zone manual mode request."""
+
+    def __init__(self, serial_number: int, zone: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + state.to_bytes(1, "little")
+        temp = temp + zone.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_ZONE_MANUAL_MODE, 2, temp)
+
+
+class P2PAutoModeRequest(P2PRequest):
+    """Defines a device auto mode request."""
+
+    def __init__(self, serial_number: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + state.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_AUTO_MODE, 1, temp)
+
+
+class P2PZoneAutoModeRequest(P2PRequest):
+    """Defines a zone auto mode request."""
+
+    def __init__(self, serial_number: int, zone: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + zone.to_bytes(1, "little")
+        temp = temp + state.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_ZONE_AUTO_MODE, 2, temp)
+
+
+class P2PEcoModeRequest(P2PRequest):
+    """Defines a device eco mode request."""
+
+    def __init__(self, serial_number: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + state.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_ECO_MODE, 1, temp)
+
+
+class P2PZoneEcoModeRequest(P2PRequest):
+    """Defines a zone eco mode request."""
+
+    def __init__(self, serial_number: int, zone: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + zone.to_bytes(1, "little")
+        temp = temp + state.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_ZONE_ECO_MODE, 2, temp)
+
+
+class P2PZoneSleepModeRequest(P2PRequest):
+    """Defines a zone sleep mode request."""
+
+    def __init__(self, serial_number: int, zone: int, state: bool) -> None:
+        """Initialize the Request for use."""
+        temp: bytearray = bytearray()
+        temp = temp + zone.to_bytes(1, "little")
+        temp = temp + state.to_bytes(1, "little")
+        super().__init__(serial_number, PACKET_ZONE_SLEEP_MODE, 2, temp)
+
+
+class P2PResponse:
+    """Defines a response packet."""
+
+    data: bytearray
+    header: int
+    serial_number: int
+    packet: int
+    packet_counter: int
+    length: int
+
+    def __init__(self, input: bytearray) -> None:
+        """Initialize the Response for use."""
+        self.data = input
+        self.header = self.data[0]
+        self.serial_number = int.from_bytes(self.data[1:5], "little")
+        self.packet = int.from_bytes([self.data[5]], "little")
+        self.packet_counter = int.from_bytes([self.data[6]], "little")
+        self.length = int.from_bytes([self.data[7]], "little")
+
+
+class P2PFirmwareResponse(P2PResponse):
+    """Firmware response packet."""
+
+    firmware: int
+    mode: int
+    private_key: int
+
+    def __init__(self, response: P2PResponse) -> None:
+        """Takes a Response and parses out the current firmware."""
+
+        super().__init__(response.data)
+        if self.packet == 0:
+            if self.length == 7:
+                self.firmware = int.from_bytes(self.data[8:9], "little")
+                self.mode = int.from_bytes([self.data[10]], "little")
+                self.private_key = int.from_bytes(self.data[11:14], "little")
+            else:
+                raise P2PError(
+                    f"Unable to get firmware response, unexpected response size: {self.length}"
+                )
+
+        else:
+            raise P2PError(
+                "Unable to get firmware response, unexpected response packet"
+            )
+
+
+class P2PConfirmationResponse(P2PResponse):
+    """Confirmation response packet."""
+
+    result: bool
+
+    def __init__(self, response: P2PResponse, packet: int) -> None:
+        """Takes a Response and parses out the confirmation."""
+
+        super().__init__(response.data)
+        if self.packet == packet:
+            if self.length == 1:
+                self.result = int.from_bytes([self.data[8]], "little") > 0
+            else:
+                raise P2PError(
+                    "Unable to get confirmation response, unexpected response size"
+                )
+
+        else:
+            raise P2PError(
+                "Unable to get confirmation response, unexpected response packet"
+            )
+
+
+class P2PStatusResponse(P2PResponse):
+    """Status response packet."""
+
+    zones: tuple[P2PZone, ...]
+    system_run: bool
+    system_auto: bool
+    eco_mode: bool
+    eco_mode_zones: int
+    eco_mode_factor: int
+
+    def __init__(self, response: P2PResponse) -> None:
+        """Takes a Response and parses out the current status."""
+
+        super().__init__(response.data)
+
+        if self.packet == 1:
+            self.system_run = bool.from_bytes([self.data[8]], "little")
+            self.system_auto = bool.from_bytes([self.data[9]], "little")
+            self.actual_output = int.from_bytes([self.data[10]], "little")
+            self.manual_mode_zones_active = int.from_bytes([self.data[11]], "little")
+            self.auto_mode_zones = int.from_bytes([self.data[12]], "little")
+            self.eco_mode = bool.from_bytes([self.data[13]], "little")
+            self.eco_mode_zones = int.from_bytes([self.data[14]], "little")
+            self.eco_mode_factor = int.from_bytes([self.data[15]], "little")
+            self.eco_mode_zones_active = int.from_bytes([self.data[16]], "little")
+            self.year = int.from_bytes(self.data[17:19], "little")
+            self.month = int.from_bytes([self.data[19]], "little")
+            self.day = int.from_bytes([self.data[20]], "little")
+            self.weekday = int.from_bytes([self.data[21]], "little")
+            self.hour = int.from_bytes([self.data[22]], "little")
+            self.minute = int.from_bytes([self.data[23]], "little")
+            self.second = int.from_bytes([self.data[24]], "little")
+            self.sleep_mode = int.from_bytes([self.data[25]], "little")
+            self.sleep_until_year = int.from_bytes(self.data[26:28], "little")
+            self.sleep_until_month = int.from_bytes([self.data[28]], "little")
+            self.sleep_until_day = int.from_bytes([self.data[29]], "little")
+            self.sleep_until_weekday = int.from_bytes([self.data[30]], "little")
+            self.sleep_until_hour = int.from_bytes([self.data[31]], "little")
+            self.sleep_until_minute = int.from_bytes([self.data[32]], "little")
+            self.sleep_until_second = int.from_bytes([self.data[33]], "little")
+            self.sleep_mode_zones = int.from_bytes([self.data[34]], "little")
+            self.zones: tuple[P2PZone, ...] = tuple(
+                P2PZone.from_masks(x, vars(self)) for x in ZONES
+            )
+
+        else:
+            raise P2PError("Unable to get status, unexpected response")
+
+
+@dataclass(frozen=True, slots=True)
+class P2PStatus:
+    """Immutable, hashable snapshot of a status response.
+
+    Snapshots are never changed in place, changes produce a new snapshot
+    sharing the untouched zones. The device clock and the version are left
+    out of equality, so two polls reporting the same state compare equal
+    and the version only moves when something entities show has changed.
+    """
+
+    system_run: bool
+    system_auto: bool
+    actual_output: int
+    manual_mode_zones_active: int
+    auto_mode_zones: int
+    eco_mode: bool
+    eco_mode_zones: int
+    eco_mode_factor: int
+    eco_mode_zones_active: int
+    sleep_mode: int
+    sleep_mode_zones: int
+    sleep_until_year: int
+    sleep_until_month: int
+    sleep_until_day: int
+    sleep_until_weekday: int
+    sleep_until_hour: int
+    sleep_until_minute: int
+    sleep_until_second: int
+    zones: tuple[P2PZone, ...]
+    year: int = field(default=0, compare=False)
+    month: int = field(default=0, compare=False)
+    day: int = field(default=0, compare=False)
+    weekday: int = field(default=0, compare=False)
+    hour: int = field(default=0, compare=False)
+    minute: int = field(default=0, compare=False)
+    second: int = field(default=0, compare=False)
+    version: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_response(cls, response: P2PStatusResponse) -> P2PStatus:
+        """Take a snapshot of a parsed status response."""
+        values = vars(response)
+        return cls(
+            **{
+                status_field.name: values[status_field.name]
+                for status_field in fields(cls)
+                if status_field.name != "version"
+            }
+        )
+
+    @property
+    def clock(self) -> datetime | None:
+        """Return the device clock, in the controller's local time."""
+        try:
+            return datetime(
+                self.year, self.month, self.day, self.hour, self.minute, self.second
+            )
+        except ValueError:
+            # Controllers that never had their clock set report zeros
+            return None
+
+    def with_zone(self, index: int, **flags: bool) -> P2PStatus:
+        """Return a snapshot with one zone changed, keeping its mask in step."""
+        masks: dict[str, int] = {}
+        for flag, value in flags.items():
+            mask: str = ZONE_MASKS[flag]
+            bits: int = masks.get(mask, getattr(self, mask))
+            masks[mask] = bits | (1 << index) if value else bits & ~(1 << index)
+
+        zones = list(self.zones)
+        zones[index] = replace(self.zones[index], **flags)
+        return replace(self, zones=tuple(zones), **masks)
+
+    def versioned(self, previous: P2PStatus | None) -> P2PStatus:
+        """Number this snapshot relative to the one it replaces."""
+        if previous is None:
+            return self
+        if self == previous:
+            return replace(self, version=previous.version)
+        return replace(self, version=previous.version + 1)
+
+
+def build_frame_table(private_key: int) -> Mapping[tuple[int, int, bool], bytes]:
+    """Serialize every request a device can be sent, keyed by (packet, zone, state).
+
+    Requests without a zone or state argument use zone 0 and False.
+    """
+    frames: dict[tuple[int, int, bool], bytes] = {
+        (PACKET_FIRMWARE, 0, False): bytes(
+            P2PRequest(private_key, PACKET_FIRMWARE, 0, bytearray()).toBytes()
+        ),
+        (PACKET_STATUS, 0, False): bytes(
+            P2PRequest(private_key, PACKET_STATUS, 0, bytearray()).toBytes()
+        ),
+    }
+
+    for state in (False, True):
+        frames[(PACKET_AUTO_MODE, 0, state)] = bytes(
+            P2PAutoModeRequest(private_key, state).toBytes()
+        )
+        frames[(PACKET_ECO_MODE, 0, state)] = bytes(
+            P2PEcoModeRequest(private_key, state).toBytes()
+        )
+        for zone in ZONES:
+            frames[(PACKET_ZONE_MANUAL_MODE, zone, state)] = bytes(
+                P2PZoneManualModeRequest(private_key, zone, state).toBytes()
+            )
+            frames[(PACKET_ZONE_AUTO_MODE, zone, state)] = bytes(
+                P2PZoneAutoModeRequest(private_key, zone, state).toBytes()
+            )
+            frames[(PACKET_ZONE_ECO_MODE, zone, state)] = bytes(
+                P2PZoneEcoModeRequest(private_key, zone, state).toBytes()
+            )
+            frames[(PACKET_ZONE_SLEEP_MODE, zone, state)] = bytes(
+                P2PZoneSleepModeRequest(private_key, zone, state).toBytes()
+            )
+
+    return MappingProxyType(frames)
+
+
+@dataclass(frozen=True, slots=True)
+class P2PCapabilities:
+    """What a controller's firmware can cope with on the wire."""
+
+    firmware: int
+    keep_alive: bool = False
+    pipeline_depth: int = 1
+    min_request_interval: float = 0.0
+    push: bool = False
+
+    @classmethod
+    def for_firmware(cls, firmware: int) -> P2PCapabilities:
+        """Return the profile of the newest listed firmware not above firmware."""
+        profile: dict[str, Any] = {}
+        for minimum, features in FIRMWARE_PROFILES:
+            if firmware >= minimum:
+                profile = features
+        return cls(firmware, **profile)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> P2PCapabilities:
+        """Restore a cached profile."""
+        return cls(
+            **{key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the profile as storable values."""
+        return {key: getattr(self, key) for key in self.__dataclass_fields__}
+
+
+# Features by minimum firmware, newer rows override older ones. Every
+# profile starts out optimistic; P2PDevice backs off to a safer mode as soon
+# as a controller misbehaves in the faster one and reports the change.
+FIRMWARE_PROFILES: tuple[tuple[int, dict[str, Any]], ...] = (
+    (
+        MIN_FIRMWARE,
+        {
+            "keep_alive": True,
+            "pipeline_depth": len(ZONES) + 1,
+            "min_request_interval": 0.1,
+        },
+    ),
+)
+
+
+class P2PRecorder(Protocol):
+    """Anything that can capture raw frames, such as P2PTrace's recorder."""
+
+    def record(self, direction: int, frame: bytes) -> None:
+        """Capture one frame."""
+
+
+@dataclass(slots=True)
+class P2PRetryStats:
+    """Counters for commands sent through the retry layer."""
+
+    commands: int = 0
+    retries: int = 0
+    recovered: int = 0
+    exhausted: int = 0
+    failures: dict[str, int] = field(
+        default_factory=lambda: dict.fromkeys(RETRY_KINDS, 0)
+    )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as plain values."""
+        return {
+            "commands": self.commands,
+            "retries": self.retries,
+            "recovered": self.recovered,
+            "exhausted": self.exhausted,
+            "failures": dict(self.failures),
+        }
+
+
+class P2PDevice:
+    """Class to communicate with the LichenHub API."""
+
+    host: str
+    port: int
+    private_key: int
+    keep_alive: bool
+    timeout: float
+    recorder: P2PRecorder | None
+    capabilities: P2PCapabilities | None
+    command_deadline: float
+    retry_stats: P2PRetryStats
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        private_key: int,
+        *,
+        keep_alive: bool = False,
+        timeout: float = REQUEST_TIMEOUT,
+    ) -> None:
+        """Initialize the API and store the auth so we can make requests."""
+        self.host = host
+        self.port = port
+        self.private_key = private_key
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        # Opt-in raw frame capture, see P2PTrace
+        self.recorder = None
+
+        # Negotiated transport features, see async_negotiate
+        self.capabilities = None
+        self.pipeline_depth = 1
+        self.min_request_interval = 0.0
+        self.on_capabilities_changed: Callable[[P2PCapabilities], None] | None = None
+        self._next_request = 0.0
+        self._drops = 0
+
+        self.command_deadline = COMMAND_DEADLINE
+        self.retry_stats = P2PRetryStats()
+
+        # Requests are serialized over a single pooled connection, which is
+        # kept open between requests only when keep_alive is set.
+        self._lock = asyncio.Lock()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+        # Hostnames resolve off the event loop; the poll path only ever reads
+        # the cached address and refreshes it in the background once stale
+        self._address: str | None = None
+        self._address_expires: float = 0.0
+        self._resolve_task: asyncio.Task[None] | None = None
+        self._set_host(host)
+
+        # The key is fixed for the life of the device, so every frame is built
+        # once here. Frames are immutable bytes, the transport may hold on to
+        # what it is given after write() returns.
+        self._frames = build_frame_table(private_key)
+
+    async def async_get_firmware(self) -> P2PFirmwareResponse:
+        """Get the current status of the lichen play."""
+        response: P2PResponse = await self._async_send_frame(PACKET_FIRMWARE)
+
+        return P2PFirmwareResponse(response)
+
+    async def async_negotiate(
+        self, cached: P2PCapabilities | None = None
+    ) -> P2PCapabilities:
+        """Ask the controller for its firmware and adopt the matching profile.
+
+        A cached profile for the same firmware wins over the table, it holds
+        whatever was learned about this controller at runtime.
+        """
+        firmware: int = (await self.async_get_firmware()).firmware
+        if cached is None or cached.firmware != firmware:
+            cached = P2PCapabilities.for_firmware(firmware)
+        self.apply_capabilities(cached)
+        return cached
+
+    def apply_capabilities(self, capabilities: P2PCapabilities) -> None:
+        """Switch the transport to the modes a profile allows."""
+        self.capabilities = capabilities
+        self.keep_alive = capabilities.keep_alive
+        self.pipeline_depth = max(1, capabilities.pipeline_depth)
+        self.min_request_interval = capabilities.min_request_interval
+        self._drops = 0
+        if not self.keep_alive:
+            self._close()
+
+    def _degrade(self, **changes: Any) -> None:
+        """Fall back to a safer mode after the controller failed in a faster one."""
+        if self.capabilities is None:
+            return
+        capabilities = replace(self.capabilities, **changes)
+        self.apply_capabilities(capabilities)
+        if self.on_capabilities_changed is not None:
+            self.on_capabilities_changed(capabilities)
+
+    async def _async_pace(self) -> None:
+        """Keep to the controller's maximum request rate, called with the lock held."""
+        if self.min_request_interval <= 0:
+            return
+        if (wait := self._next_request - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+        self._next_request = time.monotonic() + self.min_request_interval
+
+    async def async_get_status(self) -> P2PStatusResponse:
+        """Get the current status of the lichen play."""
+
+        try:
+            response: P2PResponse = await self._async_send_frame(PACKET_STATUS)
+        except P2PRequestError as e:
+            raise P2PError(f"Unable to get status, {e.error}") from e
+        return P2PStatusResponse(response)
+
+    async def async_set_zone_manual_mode(
+        self, zone: int, state: bool
+    ) -> P2PConfirmationResponse:
+        """Set manual mode for the given zone."""
+        return await self._async_command(PACKET_ZONE_MANUAL_MODE, zone, state)
+
+    async def async_set_auto_mode(self, state: bool) -> P2PConfirmationResponse:
+        """Set device auto mode for the given."""
+        return await self._async_command(PACKET_AUTO_MODE, 0, state)
+
+    async def async_set_zone_auto_mode(
+        self, zone: int, state: bool
+    ) -> P2PConfirmationResponse:
+        """Set auto mode for the given zone."""
+        return await self._async_command(PACKET_ZONE_AUTO_MODE, zone, state)
+
+    async def async_set_eco_mode(self, state: bool) -> P2PConfirmationResponse:
+        """Set device eco mode for the given."""
+        return await self._async_command(PACKET_ECO_MODE, 0, state)
+
+    async def async_set_zone_eco_mode(
+        self, zone: int, state: bool
+    ) -> P2PConfirmationResponse:
+        """Set eco mode for the given zone."""
+        return await self._async_command(PACKET_ZONE_ECO_MODE, zone, state)
+
+    async def async_set_zone_sleep_mode(
+        self, zone: int, state: bool
+    ) -> P2PConfirmationResponse:
+        """Set sleep mode for the given zone."""
+        return await self._async_command(PACKET_ZONE_SLEEP_MODE, zone, state)
+
+    async def _async_command(
+        self, packet: int, zone: int, state: bool
+    ) -> P2PConfirmationResponse:
+        """Send a set command, every one sets an absolute state so it is retried."""
+        response: P2PResponse = await self._async_retry(
+            lambda: self._async_send_frame(packet, zone, state)
+        )
+        return P2PConfirmationResponse(response, packet)
+
+    async def _async_retry(self, send: Callable[[], Awaitable[_T]]) -> _T:
+        """Repeat an idempotent request until it succeeds or the deadline passes.
+
+        Connection failures and timeouts back off with full jitter, protocol
+        errors are retried straight away on the fresh connection the failure
+        left behind. No attempt runs past command_deadline, the budget covers
+        the attempts and the waits in between.
+        """
+        stats = self.retry_stats
+        stats.commands += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.command_deadline
+        attempt = 0
+        protocol_errors = 0
+
+        while True:
+            try:
+                async with asyncio.timeout_at(deadline):
+                    result = await send()
+            except TimeoutError as err:
+                # Cut off mid-attempt, the connection is in an unknown state
+                self._close()
+                stats.failures["timeout"] += 1
+                stats.exhausted += 1
+                raise P2PTimeoutError("Timed out") from err
+            except P2PRequestError as err:
+                if err.kind is None:
+                    raise
+                stats.failures[err.kind] += 1
+                if err.kind == "protocol":
+                    protocol_errors += 1
+                    delay = 0.0
+                    retry = protocol_errors <= PROTOCOL_RETRIES
+                else:
+                    delay = random.uniform(
+                        0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt)
+                    )
+                    retry = True
+                if not retry or loop.time() + delay >= deadline:
+                    stats.exhausted += 1
+                    raise
+                attempt += 1
+                stats.retries += 1
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled, by a caller's timeout for one, possibly after the
+                # request went out. Its reply must not be read by the next one
+                self._close()
+                raise
+            else:
+                if attempt:
+                    stats.recovered += 1
+                return result
+
+    async def _async_send_frame(
+        self, packet: int, zone: int = 0, state: bool = False
+    ) -> P2PResponse:
+        """Send a prebuilt frame."""
+        try:
+            frame: bytes = self._frames[(packet, zone, state)]
+        except KeyError as err:
+            raise P2PRequestError("Invalid request") from err
+
+        async with self._lock:
+            await self._async_pace()
+            return await self._async_transfer(packet, frame)
+
+    async def async_send_commands(
+        self, commands: Sequence[tuple[int, int, bool]]
+    ) -> list[P2PConfirmationResponse]:
+        """Send several (packet, zone, state) commands pipelined on one connection.
+
+        Up to pipeline_depth frames go out in a single write and the replies
+        are read back in order, so a batch costs about one round trip. Only
+        idempotent set commands should be batched, a batch cut short is
+        resent in full, within the same deadline budget as a single command.
+        """
+        try:
+            frames: list[bytes] = [self._frames[command] for command in commands]
+        except KeyError as err:
+            raise P2PRequestError("Invalid request") from err
+
+        packets: list[int] = [packet for packet, _, _ in commands]
+        responses: list[P2PResponse] = await self._async_retry(
+            lambda: self._async_send_pipelined(packets, frames)
+        )
+
+        return [
+            P2PConfirmationResponse(response, packet)
+            for response, packet in zip(responses, packets, strict=True)
+        ]
+
+    async def _async_send_pipelined(
+        self, packets: list[int], frames: list[bytes]
+    ) -> list[P2PResponse]:
+        """Send frames in batches of pipeline_depth, one request at a time if need be."""
+        responses: list[P2PResponse] = []
+        async with self._lock:
+            while len(responses) < len(frames):
+                start = len(responses)
+                end = min(start + self.pipeline_depth, len(frames))
+                try:
+                    batch = await self._async_send_batch(
+                        packets[start:end], frames[start:end]
+                    )
+                except P2PRequestError as err:
+                    if end - start == 1 or err.kind is None:
+                        raise
+                    # Out of step, silent or dropped with several frames in
+                    # flight, carry on one request at a time
+                    self._degrade(pipeline_depth=1)
+                    self.pipeline_depth = 1
+                else:
+                    responses.extend(batch)
+        return responses
+
+    async def _async_send_batch(
+        self, packets: list[int], frames: list[bytes]
+    ) -> list[P2PResponse]:
+        """Pipeline one batch of frames, called with the lock held."""
+        await self._async_pace()
+        return await self._async_pipeline(packets, frames, b"".join(frames))
+
+    async def async_get_response(self, request: P2PRequest) -> P2PResponse:
+        """Send a request to the device."""
+        async with self._lock:
+            await self._async_pace()
+            return await self._async_transfer(request.packet, request.toBytes())
+
+    async def async_subscribe(
+        self,
+        on_status: Callable[[P2PStatusResponse], None],
+        quiet_timeout: float,
+    ) -> int:
+        """Feed status frames the controller pushes to on_status.
+
+        Runs on a connection of its own, so requests are not held up, and
+        returns the number of frames received once the stream closes or stays
+        quiet for quiet_timeout seconds. The status request that opens the
+        stream is answered like any other, so a controller that doesn't push
+        returns 1.
+        """
+        try:
+            reader, writer = await self._async_open(await self._async_address())
+        except (OSError, TimeoutError) as err:
+            raise P2PConnectionError("Connection failed") from err
+
+        frames = 0
+        try:
+            frame = self._frames[(PACKET_STATUS, 0, False)]
+            if self.recorder is not None:
+                self.recorder.record(DIRECTION_REQUEST, frame)
+            writer.write(frame)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+
+            while True:
+                header: bytes = await asyncio.wait_for(
+                    reader.readexactly(FRAME_HEADER_SIZE), quiet_timeout
+                )
+                payload: bytes = await asyncio.wait_for(
+                    reader.readexactly(header[PACKET_LENGTH_OFFSET] + 1), self.timeout
+                )
+                data = header + payload
+                if self.recorder is not None:
+                    self.recorder.record(DIRECTION_RESPONSE, data)
+
+                buffer: bytearray = bytearray(max(RESPONSE_BUFFER_SIZE, len(data)))
+                buffer[: len(data)] = data
+                response = P2PResponse(buffer)
+                if response.header != ord("$"):
+                    raise P2PProtocolError("Unexpected header")
+                if response.packet == PACKET_STATUS:
+                    frames += 1
+                    on_status(P2PStatusResponse(response))
+        except (TimeoutError, OSError, asyncio.IncompleteReadError):
+            return frames
+        finally:
+            writer.close()
+
+    async def async_reconfigure(self, host: str, port: int) -> None:
+        """Point the device at a new address once in-flight requests drain."""
+        async with self._lock:
+            if (host, port) == (self.host, self.port):
+                return
+            self._close()
+            self._set_host(host)
+            self.port = port
+
+    def _set_host(self, host: str) -> None:
+        """Store the host, IP literals never need resolving."""
+        self.host = host
+        try:
+            self._address = str(ipaddress.ip_address(host))
+            self._address_expires = float("inf")
+        except ValueError:
+            self._address = None
+            self._address_expires = 0.0
+
+    async def _async_resolve(self) -> None:
+        """Resolve the hostname without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(
+                self.host, self.port, family=socket.AF_INET, type=socket.SOCK_STREAM
+            )
+        except OSError as err:
+            raise P2PConnectionError("Unable to resolve host") from err
+        self._address = infos[0][4][0]
+        self._address_expires = time.monotonic() + DNS_CACHE_TTL
+
+    async def _async_refresh_address(self) -> None:
+        """Re-resolve a stale address in the background."""
+        try:
+            await self._async_resolve()
+        except P2PRequestError:
+            # Keep using the stale address, a connection failure re-resolves
+            pass
+
+    async def _async_address(self) -> str:
+        """Return the address to connect to, resolving only when unknown."""
+        if self._address is None:
+            await self._async_resolve()
+        elif time.monotonic() > self._address_expires and (
+            self._resolve_task is None or self._resolve_task.done()
+        ):
+            self._resolve_task = asyncio.get_running_loop().create_task(
+                self._async_refresh_address()
+            )
+        assert self._address is not None
+        return self._address
+
+    async def async_close(self) -> None:
+        """Close the pooled connection once in-flight requests drain."""
+        async with self._lock:
+            self._close()
+            if self._resolve_task is not None:
+                self._resolve_task.cancel()
+                self._resolve_task = None
+
+    def _close(self) -> None:
+        """Drop the pooled connection, the next request reconnects."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _async_connect(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Return the pooled connection, opening it if needed."""
+        if (
+            self._reader is None
+            or self._writer is None
+            or self._writer.is_closing()
+        ):
+            address = await self._async_address()
+            try:
+                self._reader, self._writer = await self._async_open(address)
+            except (OSError, TimeoutError) as err:
+                self._close()
+                if self._address_expires == float("inf"):
+                    raise P2PConnectionError("Connection failed") from err
+                # The name may point somewhere new, look it up again
+                await self._async_resolve()
+                if self._address == address:
+                    raise P2PConnectionError("Connection failed") from err
+                try:
+                    self._reader, self._writer = await self._async_open(
+                        self._address
+                    )
+                except (OSError, TimeoutError) as retry_err:
+                    self._close()
+                    raise P2PConnectionError("Connection failed") from retry_err
+        return self._reader, self._writer
+
+    async def _async_open(
+        self, address: str
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a connection to a resolved address."""
+        return await asyncio.wait_for(
+            asyncio.open_connection(address, self.port), self.timeout
+        )
+
+    async def _async_roundtrip(self, output: bytes) -> bytes:
+        """Write a frame on the pooled connection and read the reply."""
+        reader, writer = await self._async_connect()
+
+        if self.recorder is not None:
+            self.recorder.record(DIRECTION_REQUEST, output)
+
+        try:
+            writer.write(output)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            data: bytes = await asyncio.wait_for(
+                reader.read(RESPONSE_BUFFER_SIZE), self.timeout
+            )
+        except TimeoutError as err:
+            self._close()
+            raise P2PTimeoutError("Timed out") from err
+        except asyncio.CancelledError:
+            # The reply may still arrive, don't leave it for the next request
+            self._close()
+            raise
+
+        if self.recorder is not None and data:
+            self.recorder.record(DIRECTION_RESPONSE, data)
+        return data
+
+    async def _async_transfer(self, packet: int, output: bytes) -> P2PResponse:
+        """Send a serialized request and wait for the matching response."""
+
+        reused: bool = self._writer is not None and not self._writer.is_closing()
+
+        try:
+            data: bytes = await self._async_roundtrip(output)
+        except OSError as err:
+            self._close()
+            if not reused:
+                raise P2PConnectionError("Failed to send request") from err
+            data = b""
+
+        if not data and reused:
+            # The device dropped the pooled connection while it sat idle,
+            # which is not an answer, so try once more on a fresh one
+            self._close()
+            self._drops += 1
+            if self._drops >= KEEP_ALIVE_DROPS:
+                # Every request paying for a dead connection first is slower
+                # than reconnecting each time
+                self._degrade(keep_alive=False)
+            try:
+                data = await self._async_roundtrip(output)
+            except OSError as err:
+                self._close()
+                raise P2PConnectionError("Failed to send request") from err
+
+        elif data and reused:
+            self._drops = 0
+
+        if not self.keep_alive or not data:
+            self._close()
+
+        if data:
+            buffer: bytearray = bytearray(RESPONSE_BUFFER_SIZE)
+            buffer[: len(data)] = data
+            response = P2PResponse(buffer)
+            if response.header == ord("$"):
+                if response.packet == packet:
+                    return response
+                # A pooled stream that is out of step can't be trusted again
+                self._close()
+                raise P2PProtocolError("Packet mismatch")
+            self._close()
+            raise P2PProtocolError("Unexpected header")
+        raise P2PNoReplyError("Check private key")
+
+    async def _async_pipeline(
+        self, packets: list[int], frames: list[bytes], output: bytes
+    ) -> list[P2PResponse]:
+        """Send a batch, retrying once on a fresh connection if a reused one died."""
+        reused: bool = self._writer is not None and not self._writer.is_closing()
+
+        try:
+            responses = await self._async_pipeline_roundtrip(packets, frames, output)
+        except (OSError, asyncio.IncompleteReadError) as err:
+            self._close()
+            if not reused:
+                raise P2PConnectionError("Failed to send request") from err
+            try:
+                responses = await self._async_pipeline_roundtrip(
+                    packets, frames, output
+                )
+            except (OSError, asyncio.IncompleteReadError) as retry_err:
+                self._close()
+                raise P2PConnectionError("Failed to send request") from retry_err
+
+        if not self.keep_alive:
+            self._close()
+        return responses
+
+    async def _async_pipeline_roundtrip(
+        self, packets: list[int], frames: list[bytes], output: bytes
+    ) -> list[P2PResponse]:
+        """Write all frames at once, then read one framed reply per request."""
+        reader, writer = await self._async_connect()
+
+        if self.recorder is not None:
+            for frame in frames:
+                self.recorder.record(DIRECTION_REQUEST, frame)
+
+        responses: list[P2PResponse] = []
+        try:
+            writer.write(output)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            for packet in packets:
+                # Replies can't be split on read() boundaries once several are
+                # in flight, so use the length byte to frame each one
+                header: bytes = await asyncio.wait_for(
+                    reader.readexactly(FRAME_HEADER_SIZE), self.timeout
+                )
+                payload: bytes = await asyncio.wait_for(
+                    reader.readexactly(header[PACKET_LENGTH_OFFSET] + 1),
+                    self.timeout,
+                )
+                data = header + payload
+                if self.recorder is not None:
+                    self.recorder.record(DIRECTION_RESPONSE, data)
+
+                buffer: bytearray = bytearray(max(RESPONSE_BUFFER_SIZE, len(data)))
+                buffer[: len(data)] = data
+                response = P2PResponse(buffer)
+                if response.header != ord("$"):
+                    self._close()
+                    raise P2PProtocolError("Unexpected header")
+                if response.packet != packet:
+                    self._close()
+                    raise P2PProtocolError("Packet mismatch")
+                responses.append(response)
+        except TimeoutError as err:
+            self._close()
+            raise P2PTimeoutError("Timed out") from err
+        except asyncio.CancelledError:
+            # The replies may still arrive, don't leave them for the next batch
+            self._close()
+            raise
+
+        return responses
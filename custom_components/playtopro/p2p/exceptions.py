@@ -0,0 +1,52 @@
+"""Exceptions raised by the P2P client."""
+
+from __future__ import annotations
+
+
+class P2PError(Exception):
+    """Base class for P2P exceptions."""
+
+    def __init__(self, error: str) -> None:
+        """Initialize error."""
+        super().__init__(error)
+        self.error = error
+
+
+class P2PRequestError(P2PError):
+    """Error Requesting packet."""
+
+    # Retry class of the failure, None when a retry can't help
+    kind: str | None = None
+
+
+class P2PConnectionError(P2PRequestError):
+    """The device could not be reached."""
+
+    kind = "connection"
+
+
+class P2PTimeoutError(P2PRequestError):
+    """The device did not answer in time."""
+
+    kind = "timeout"
+
+
+class P2PProtocolError(P2PRequestError):
+    """The device answered out of step or not at all."""
+
+    kind = "protocol"
+
+
+class P2PNoReplyError(P2PProtocolError):
+    """The device took the request but closed without answering.
+
+    This is what a controller does with a request under the wrong key.
+    """
+
+
+class DeviceNotFoundError(P2PError):
+    """No device found."""
+
+
+class InvalidPrivateKeyError(P2PError):
+    """Invalid private key."""
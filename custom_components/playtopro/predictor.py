@@ -0,0 +1,211 @@
+"""Polling that tightens around the times the controller's schedules run."""
+
+from __future__ import annotations
+
+import bisect
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, LOGGER, RUNTIME_SAVE_DELAY, ZONE_COUNT
+from .p2p import P2PStatus
+
+STORAGE_VERSION = 1
+
+SECONDS_PER_DAY = 86400
+
+# Polled every second from this long before a predicted start or stop until
+# this long after it
+GUARD = 90
+FAST_INTERVAL = 1.0
+# Longest wait between polls while no start or stop is due. It is also held
+# to half the grace period, so one failed poll still serves the last status
+RELAXED_INTERVAL = 15.0
+
+# Automatic starts and stops remembered per zone
+EVENTS_KEPT = 14
+
+# Clock offsets are sampled at most this often, and drift is only estimated
+# once the samples span DRIFT_MIN_SPAN
+CLOCK_SAMPLE_SPACING = 300
+CLOCK_SAMPLES = 288
+DRIFT_MIN_SPAN = 3600
+# Offset worth telling the user about, schedules run on the controller clock
+CLOCK_WARN_OFFSET = 300
+
+
+class P2PPollPredictor:
+    """Learns when zones start and stop on their own, and paces polling.
+
+    Starts and stops of zones in auto mode are remembered as minutes of the
+    controller's day. Polling runs every second around those minutes and
+    relaxes in between, so a schedule is seen starting and stopping at once
+    without polling fast all day.
+    """
+
+    offset: float | None
+    drift: float | None
+
+    def __init__(self, hass: HomeAssistant, serial_number: int) -> None:
+        """Initialize the predictor."""
+        self.hass = hass
+        self.serial_number = serial_number
+        # Device clock minus HA's local clock, in seconds
+        self.offset = None
+        # Seconds a day the device clock gains on HA
+        self.drift = None
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.predictor.{serial_number}"
+        )
+        self._starts: list[deque[int]] = [
+            deque(maxlen=EVENTS_KEPT) for _ in range(ZONE_COUNT)
+        ]
+        self._stops: list[deque[int]] = [
+            deque(maxlen=EVENTS_KEPT) for _ in range(ZONE_COUNT)
+        ]
+        # Predicted start and stop times, seconds into the controller's day
+        self._events: list[int] = []
+        self._samples: deque[tuple[float, float]] = deque(maxlen=CLOCK_SAMPLES)
+        self._last_output: int | None = None
+        self._warned = False
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Restore the learned start and stop times."""
+        data = await self._store.async_load()
+        self._loaded = True
+        if data is None:
+            return
+        for events, stored in zip(self._starts, data.get("starts", []), strict=False):
+            events.extend(stored)
+        for events, stored in zip(self._stops, data.get("stops", []), strict=False):
+            events.extend(stored)
+        self._async_compile()
+
+    async def async_save(self) -> None:
+        """Write the learned times to storage immediately."""
+        if self._loaded:
+            await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "starts": [list(events) for events in self._starts],
+            "stops": [list(events) for events in self._stops],
+        }
+
+    @callback
+    def async_update(self, status: P2PStatus, now: datetime) -> None:
+        """Take a status sample, learning from zones that switched by schedule."""
+        if (clock := status.clock) is not None:
+            self._async_track_clock(clock, now)
+
+        output = status.actual_output
+        if self._last_output is not None and (changed := output ^ self._last_output):
+            # Only the controller's own schedule says anything about the future
+            automatic = (
+                status.auto_mode_zones & ~status.manual_mode_zones_active
+                if status.system_auto
+                else 0
+            )
+            if changed & automatic and (device_now := self._device_now(status, now)):
+                minute = device_now.hour * 60 + device_now.minute
+                for zone in range(ZONE_COUNT):
+                    if (changed & automatic) >> zone & 0x01:
+                        on = output >> zone & 0x01
+                        (self._starts if on else self._stops)[zone].append(minute)
+                self._async_compile()
+                self._store.async_delay_save(self._data_to_save, RUNTIME_SAVE_DELAY)
+        self._last_output = output
+
+    def next_interval(
+        self, status: P2PStatus | None, now: datetime, base: timedelta, grace: float
+    ) -> timedelta:
+        """Return how long to wait for the next poll.
+
+        Never slower than base while nothing has been learned yet, and never
+        faster than base when relaxed. Relaxed waits stay within half of
+        grace, the seconds a failed poll may serve the last status for.
+        """
+        if not self._events or status is None:
+            return base
+        if (device_now := self._device_now(status, now)) is None:
+            return base
+
+        second = device_now.hour * 3600 + device_now.minute * 60 + device_now.second
+        index = bisect.bisect_left(self._events, second)
+        following = self._events[index % len(self._events)]
+        previous = self._events[index - 1]
+        until = (following - second) % SECONDS_PER_DAY
+        since = (second - previous) % SECONDS_PER_DAY
+
+        if until <= GUARD or since <= GUARD:
+            return timedelta(seconds=min(FAST_INTERVAL, base.total_seconds()))
+        longest = min(RELAXED_INTERVAL, grace / 2)
+        relaxed = max(min(longest, until - GUARD), base.total_seconds())
+        return timedelta(seconds=relaxed)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the clock estimate and learned times as plain values."""
+        return {
+            "offset_s": round(self.offset, 1) if self.offset is not None else None,
+            "drift_s_per_day": (
+                round(self.drift, 2) if self.drift is not None else None
+            ),
+            "events": [
+                f"{event // 3600:02d}:{event // 60 % 60:02d}" for event in self._events
+            ],
+        }
+
+    def _device_now(self, status: P2PStatus, now: datetime) -> datetime | None:
+        """Return the controller's time, estimated from HA's if it has none."""
+        if (clock := status.clock) is not None:
+            return clock
+        if self.offset is None:
+            return None
+        return now.replace(tzinfo=None) + timedelta(seconds=self.offset)
+
+    @callback
+    def _async_track_clock(self, clock: datetime, now: datetime) -> None:
+        """Update the offset and drift of the device clock against HA."""
+        offset = (clock - now.replace(tzinfo=None)).total_seconds()
+        timestamp = now.timestamp()
+        self.offset = offset
+
+        if self._samples and timestamp - self._samples[-1][0] < CLOCK_SAMPLE_SPACING:
+            return
+        self._samples.append((timestamp, offset))
+
+        if self._samples[-1][0] - self._samples[0][0] >= DRIFT_MIN_SPAN:
+            # Least squares slope of offset over time, in seconds per day
+            count = len(self._samples)
+            mean_t = sum(t for t, _ in self._samples) / count
+            mean_o = sum(o for _, o in self._samples) / count
+            variance = sum((t - mean_t) ** 2 for t, _ in self._samples)
+            covariance = sum(
+                (t - mean_t) * (o - mean_o) for t, o in self._samples
+            )
+            self.drift = covariance / variance * SECONDS_PER_DAY
+
+        if abs(offset) > CLOCK_WARN_OFFSET and not self._warned:
+            self._warned = True
+            LOGGER.warning(
+                "Clock of controller %s is %d seconds off, its schedules run on "
+                "its own clock",
+                self.serial_number,
+                offset,
+            )
+
+    @callback
+    def _async_compile(self) -> None:
+        """Merge every zone's starts and stops into one sorted list."""
+        self._events = sorted(
+            {
+                minute * 60
+                for events in (*self._starts, *self._stops)
+                for minute in events
+            }
+        )
@@ -0,0 +1,99 @@
+"""Zeroconf presence tracking for P2P devices."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from zeroconf import ServiceStateChange, Zeroconf
+from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo
+
+from homeassistant.components.zeroconf import async_get_async_instance
+from homeassistant.core import HomeAssistant, callback
+
+from .const import LOGGER, ZEROCONF_TYPE
+
+if TYPE_CHECKING:
+    from .coordinator import P2PDataUpdateCoordinator
+
+SERVICE_INFO_TIMEOUT = 3000
+
+
+class P2PPresenceMonitor:
+    """Feeds zeroconf announcements and goodbyes to the coordinators."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the monitor."""
+        self.hass = hass
+        self._browser: AsyncServiceBrowser | None = None
+        self._coordinators: dict[str, P2PDataUpdateCoordinator] = {}
+        # Goodbye packets only carry the service name, not the TXT record
+        self._names: dict[str, str] = {}
+
+    @callback
+    def async_register(
+        self, serial_number: str, coordinator: P2PDataUpdateCoordinator
+    ) -> None:
+        """Route presence changes for a serial number to its coordinator."""
+        self._coordinators[serial_number] = coordinator
+
+    @callback
+    def async_unregister(self, serial_number: str) -> None:
+        """Stop routing presence changes for a serial number."""
+        self._coordinators.pop(serial_number, None)
+
+    @property
+    def idle(self) -> bool:
+        """Return True when no coordinator is registered."""
+        return not self._coordinators
+
+    async def async_start(self) -> None:
+        """Start browsing for controllers."""
+        aiozc = await async_get_async_instance(self.hass)
+        self._browser = AsyncServiceBrowser(
+            aiozc.zeroconf, ZEROCONF_TYPE, handlers=[self._async_service_changed]
+        )
+
+    async def async_stop(self) -> None:
+        """Stop browsing."""
+        if self._browser is not None:
+            await self._browser.async_cancel()
+            self._browser = None
+
+    def _async_service_changed(
+        self,
+        zeroconf: Zeroconf,
+        service_type: str,
+        name: str,
+        state_change: ServiceStateChange,
+    ) -> None:
+        """Handle a service browser event, called from the event loop."""
+        if state_change is ServiceStateChange.Removed:
+            if (serial_number := self._names.get(name)) is not None:
+                self.async_set_present(serial_number, False)
+            return
+
+        self.hass.async_create_background_task(
+            self._async_resolve(zeroconf, service_type, name),
+            f"playtopro presence {name}",
+        )
+
+    async def _async_resolve(
+        self, zeroconf: Zeroconf, service_type: str, name: str
+    ) -> None:
+        """Look up the serial number of an announced controller."""
+        info = AsyncServiceInfo(service_type, name)
+        if not await info.async_request(zeroconf, SERVICE_INFO_TIMEOUT):
+            return
+        if (serial := info.properties.get(b"serial")) is None:
+            return
+
+        serial_number = serial.decode()
+        self._names[name] = serial_number
+        self.async_set_present(serial_number, True)
+
+    @callback
+    def async_set_present(self, serial_number: str, present: bool) -> None:
+        """Tell the coordinator for a serial number whether it is reachable."""
+        if (coordinator := self._coordinators.get(serial_number)) is not None:
+            LOGGER.debug("Presence of %s: %s", serial_number, present)
+            coordinator.async_set_present(present)
@@ -0,0 +1,227 @@
+"""On-demand profiling of the coordinator and entity hot paths."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import functools
+import io
+import json
+import math
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_SERIAL_NUMBER, DOMAIN, LOGGER
+
+if TYPE_CHECKING:
+    import cProfile
+
+    from .coordinator import P2PDataUpdateCoordinator
+
+PHASE_NETWORK = "network"
+PHASE_DECODE = "decode"
+PHASE_DISPATCH = "dispatch"
+PHASE_STATE_WRITE = "state_write"
+PHASES = (PHASE_NETWORK, PHASE_DECODE, PHASE_DISPATCH, PHASE_STATE_WRITE)
+
+OUTPUT_LOG = "log"
+OUTPUT_FILE = "file"
+
+# Functions listed from the cProfile run when reporting to the log
+PROFILE_TOP = 30
+
+
+class P2PProfiler:
+    """Times coordinator phases for a fixed window.
+
+    Nothing on the hot paths knows about the profiler: while it runs, the
+    timed methods are shadowed by instance attributes, which are deleted
+    again when it stops, so there is no cost at all when it is off.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: P2PDataUpdateCoordinator,
+        *,
+        output: str = OUTPUT_LOG,
+        sample: bool = False,
+    ) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.output = output
+        self.samples: dict[str, list[float]] = {phase: [] for phase in PHASES}
+        self._profile: cProfile.Profile | None = None
+        if sample:
+            # Imported lazily, only needed for sampled profiles
+            import cProfile
+
+            self._profile = cProfile.Profile()
+        self._patched: list[tuple[object, str]] = []
+        self._write = 0.0
+        self._started = 0.0
+        self._unsub_stop: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self, duration: float) -> None:
+        """Start collecting, stopping again after duration seconds."""
+        if self._profile is not None:
+            # Raises ValueError if another profiler is already active
+            self._profile.enable()
+
+        device = self.coordinator.device
+        self._patch(device, "_async_roundtrip", self._wrap_network)
+        self._patch(self.coordinator, "_decode_status", self._wrap_decode)
+        self._patch(self.coordinator, "async_update_listeners", self._wrap_dispatch)
+        for entity in self.coordinator.async_listener_entities():
+            self._patch(entity, "async_write_ha_state", self._wrap_state_write)
+
+        self._started = time.perf_counter()
+        self._unsub_stop = async_call_later(self.hass, duration, self._async_finish)
+        LOGGER.info(
+            "Profiling %s for %ss", self.coordinator.config_entry.title, duration
+        )
+
+    async def _async_finish(self, _now: Any) -> None:
+        """Stop collecting once the window has passed and report."""
+        self._unsub_stop = None
+        await self.async_stop()
+
+    async def async_stop(self) -> None:
+        """Restore the hot paths and write the report."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        if not self._patched:
+            return
+
+        for obj, name in self._patched:
+            obj.__dict__.pop(name, None)
+        self._patched.clear()
+        if self._profile is not None:
+            self._profile.disable()
+        if self.coordinator.profiler is self:
+            self.coordinator.profiler = None
+
+        report = self.report()
+        if self.output == OUTPUT_FILE:
+            path = await self.hass.async_add_executor_job(self._write_files, report)
+            LOGGER.info("Profile of %s written to %s", self._title, path)
+        else:
+            LOGGER.info(
+                "Profile of %s: %s%s",
+                self._title,
+                json.dumps(report, indent=2),
+                self._profile_text(),
+            )
+
+    def report(self) -> dict[str, Any]:
+        """Aggregate the collected samples per phase, in milliseconds."""
+        phases: dict[str, dict[str, float | int]] = {}
+        for phase, samples in self.samples.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+            phases[phase] = {
+                "count": count,
+                "total_ms": round(sum(ordered) * 1000, 3),
+                "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+                # Nearest rank, as in the fleet tool's bench
+                "p95_ms": (
+                    round(ordered[math.ceil(count * 0.95) - 1] * 1000, 3)
+                    if count
+                    else 0.0
+                ),
+                "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+            }
+        return {
+            "entry": self._title,
+            "duration_s": round(time.perf_counter() - self._started, 3),
+            "phases": phases,
+        }
+
+    @property
+    def _title(self) -> str:
+        return self.coordinator.config_entry.title
+
+    def _patch(self, obj: object, name: str, wrap: Callable[[Any], Any]) -> None:
+        """Shadow a method with a timed wrapper on this instance only."""
+        obj.__dict__[name] = wrap(getattr(obj, name))
+        self._patched.append((obj, name))
+
+    def _wrap_network(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        async def _timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples[PHASE_NETWORK].append(time.perf_counter() - started)
+
+        return _timed
+
+    def _wrap_decode(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def _timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[PHASE_DECODE].append(time.perf_counter() - started)
+
+        return _timed
+
+    def _wrap_dispatch(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def _timed(*args: Any, **kwargs: Any) -> Any:
+            # Entity handlers only, the state writes are their own phase
+            write = self._write
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.samples[PHASE_DISPATCH].append(elapsed - (self._write - write))
+
+        return _timed
+
+    def _wrap_state_write(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def _timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self._write += elapsed
+                self.samples[PHASE_STATE_WRITE].append(elapsed)
+
+        return _timed
+
+    def _profile_text(self) -> str:
+        """Return the busiest functions of the cProfile run, if any."""
+        if self._profile is None:
+            return ""
+        import pstats
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+        return "\n" + stream.getvalue()
+
+    def _write_files(self, report: dict[str, Any]) -> str:
+        """Write the report, and the raw cProfile stats, next to the traces."""
+        serial_number = self.coordinator.config_entry.data[CONF_SERIAL_NUMBER]
+        stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+        base = Path(self.hass.config.path(DOMAIN, f"profile_{serial_number}_{stamp}"))
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        path = base.with_suffix(".json")
+        path.write_text(json.dumps(report, indent=2))
+        if self._profile is not None:
+            self._profile.dump_stats(base.with_suffix(".prof"))
+        return str(path)
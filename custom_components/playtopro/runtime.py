@@ -0,0 +1,218 @@
+"""Per-zone runtime accumulators for P2P devices."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.const import UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, LOGGER, RUNTIME_SAVE_DELAY, ZONE_COUNT
+from .p2p import P2PStatus
+
+STORAGE_VERSION = 1
+
+# Samples further apart than this are not credited in full, the zone state
+# in between is unknown (HA restart, device offline).
+MAX_SAMPLE_GAP = 300
+
+# Tolerated disagreement between the device clock and HA when crediting a sample.
+MAX_CLOCK_SKEW = 5
+
+SECONDS_PER_DAY = 86400
+
+RUNTIME_PERIODS: dict[str, str] = {"today": "Today", "month": "This Month"}
+
+
+class P2PZoneRuntime:
+    """Running watering totals for a single zone, in seconds."""
+
+    index: int
+    total: float
+    today: float
+    month: float
+
+    def __init__(self, index: int) -> None:
+        """Initialize the accumulators."""
+        self.index = index
+        self.total = 0.0
+        self.today = 0.0
+        self.month = 0.0
+
+
+class P2PRuntimeTracker:
+    """Accumulates per-zone watering time from actual_output transitions."""
+
+    zones: list[P2PZoneRuntime]
+
+    def __init__(self, hass: HomeAssistant, serial_number: int) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.serial_number = serial_number
+        self.zones = [P2PZoneRuntime(index) for index in range(ZONE_COUNT)]
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.runtime.{serial_number}"
+        )
+        self._date: str | None = None
+        self._last_output: int = 0
+        self._last_clock: int | None = None
+        self._last_time: datetime | None = None
+        self._hour_start: datetime | None = None
+        self._loaded = False
+        # Closed hours waiting to be imported, per zone: [start timestamp, sum minutes]
+        self._pending: list[list[tuple[float, float]]] = [[] for _ in range(ZONE_COUNT)]
+
+    async def async_load(self) -> None:
+        """Restore accumulators from storage."""
+        data = await self._store.async_load()
+        self._loaded = True
+        if data is None:
+            return
+
+        self._date = data.get("date")
+        for zone, stored in zip(self.zones, data.get("zones", []), strict=False):
+            zone.total = stored.get("total", 0.0)
+            zone.today = stored.get("today", 0.0)
+            zone.month = stored.get("month", 0.0)
+        for pending, stored in zip(self._pending, data.get("pending", []), strict=False):
+            pending.extend((start, value) for start, value in stored)
+
+    async def async_save(self) -> None:
+        """Write accumulators to storage immediately."""
+        if not self._loaded:
+            # Never overwrite stored totals with the empty defaults.
+            return
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "date": self._date,
+            "zones": [
+                {"total": zone.total, "today": zone.today, "month": zone.month}
+                for zone in self.zones
+            ],
+            "pending": self._pending,
+        }
+
+    @callback
+    def async_update(self, status: P2PStatus, now: datetime) -> None:
+        """Credit the time since the previous sample to the zones that were on."""
+        date = now.date().isoformat()
+        if self._date != date:
+            if self._date is None or self._date[:7] != date[:7]:
+                for zone in self.zones:
+                    zone.month = 0.0
+            for zone in self.zones:
+                zone.today = 0.0
+            self._date = date
+
+        clock = status.hour * 3600 + status.minute * 60 + status.second
+        elapsed = self._async_elapsed(clock, now)
+
+        if elapsed > 0 and self._last_output:
+            for zone in self.zones:
+                if (self._last_output >> zone.index) & 0x01:
+                    zone.total += elapsed
+                    zone.today += elapsed
+                    zone.month += elapsed
+
+        self._async_close_hour(now)
+
+        self._last_output = status.actual_output
+        self._last_clock = clock
+        self._last_time = now
+        self._store.async_delay_save(self._data_to_save, RUNTIME_SAVE_DELAY)
+
+    @callback
+    def _async_elapsed(self, clock: int, now: datetime) -> float:
+        """Return the seconds to credit, preferring the device clock."""
+        if self._last_time is None or self._last_clock is None:
+            return 0.0
+
+        wall = (now - self._last_time).total_seconds()
+        if wall <= 0:
+            return 0.0
+        if wall > MAX_SAMPLE_GAP:
+            return float(MAX_SAMPLE_GAP)
+
+        device = (clock - self._last_clock) % SECONDS_PER_DAY
+        if abs(device - wall) <= MAX_CLOCK_SKEW:
+            return float(device)
+        return wall
+
+    @callback
+    def _async_close_hour(self, now: datetime) -> None:
+        """Queue the totals of a completed hour for the recorder."""
+        hour_start = dt_util.as_utc(now).replace(minute=0, second=0, microsecond=0)
+        if self._hour_start is None:
+            self._hour_start = hour_start
+            return
+        if hour_start == self._hour_start:
+            return
+
+        start = self._hour_start.timestamp()
+        for zone, pending in zip(self.zones, self._pending, strict=True):
+            pending.append((start, round(zone.total / 60, 2)))
+        self._hour_start = hour_start
+        self.hass.async_create_task(self.async_import_statistics())
+
+    async def async_import_statistics(self) -> None:
+        """Push queued hours to long-term statistics, one batch per zone."""
+        if "recorder" not in self.hass.config.components:
+            return
+        if not any(self._pending):
+            return
+
+        # Imported lazily, the recorder is an optional after-dependency.
+        from homeassistant.components.recorder.models import (
+            StatisticData,
+            StatisticMeanType,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+        from homeassistant.util.unit_conversion import (
+            DurationConverter,
+        )
+
+        for zone, pending in zip(self.zones, self._pending, strict=True):
+            if not pending:
+                continue
+            metadata = StatisticMetaData(
+                has_sum=True,
+                mean_type=StatisticMeanType.NONE,
+                name=f"PlayToPro {self.serial_number} Zone {(zone.index + 1):02d} Runtime",
+                source=DOMAIN,
+                statistic_id=(
+                    f"{DOMAIN}:zone_runtime_{self.serial_number}_{zone.index:02d}"
+                ),
+                unit_class=DurationConverter.UNIT_CLASS,
+                unit_of_measurement=UnitOfTime.MINUTES,
+            )
+            statistics = [
+                StatisticData(
+                    start=dt_util.utc_from_timestamp(start), state=value, sum=value
+                )
+                for start, value in pending
+            ]
+            async_add_external_statistics(self.hass, metadata, statistics)
+            LOGGER.debug(
+                "Imported %s hour(s) of runtime statistics for zone %s",
+                len(statistics),
+                zone.index,
+            )
+            pending.clear()
+
+        self._store.async_delay_save(self._data_to_save, RUNTIME_SAVE_DELAY)
+
+    def minutes(self, index: int, period: str) -> float:
+        """Return the accumulated minutes for a zone and period."""
+        zone = self.zones[index]
+        seconds: float = getattr(zone, period)
+        return round(seconds / 60, 1)
+
@@ -0,0 +1,203 @@
+"""Local per-zone irrigation programs run by Home Assistant."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+import heapq
+import itertools
+from typing import Any
+import uuid
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .sequencer import P2PRun, P2PRunSequencer
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.schedules"
+
+# Far enough to find the next start of a program that runs on any weekday
+SEARCH_DAYS = 8
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@dataclass(slots=True)
+class P2PProgram:
+    """A zone watering program: a start time, a duration and the weekdays it runs."""
+
+    serial_number: int
+    zone: int
+    start: dt_time
+    duration: int
+    weekdays: list[int] = field(default_factory=lambda: list(range(7)))
+    enabled: bool = True
+    program_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> P2PProgram:
+        """Restore a stored program."""
+        return cls(
+            serial_number=data["serial_number"],
+            zone=data["zone"],
+            start=dt_time.fromisoformat(data["start"]),
+            duration=data["duration"],
+            weekdays=data["weekdays"],
+            enabled=data["enabled"],
+            program_id=data["program_id"],
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the program as storable values."""
+        return {**asdict(self), "start": self.start.isoformat()}
+
+    def next_start(self, after: datetime) -> datetime | None:
+        """Return the first start strictly after the given time, in UTC."""
+        if not self.enabled or not self.weekdays:
+            return None
+        local = dt_util.as_local(after)
+        for offset in range(SEARCH_DAYS):
+            day = local.date() + timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            start = datetime.combine(day, self.start, tzinfo=local.tzinfo)
+            if start > local:
+                return dt_util.as_utc(start)
+        return None
+
+
+class P2PScheduler:
+    """Starts every program from one min-heap of upcoming starts.
+
+    Only the next start is armed as a timer. A start hands the program's run
+    to the run queue, which holds it to the zone limits, stops it on time and
+    remembers it across restarts, and queues the next start of the program,
+    so the heap never holds more than one event per program.
+    """
+
+    def __init__(self, hass: HomeAssistant, sequencer: P2PRunSequencer) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self.sequencer = sequencer
+        self.programs: dict[str, P2PProgram] = {}
+        # Set by an emergency stop, no program starts until resumed
+        self.suspended = False
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # (when, sequence, program id), the sequence keeps ties stable
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._sequence = itertools.count()
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> None:
+        """Restore the programs and arm the first start."""
+        if (data := await self._store.async_load()) is not None:
+            for stored in data.get("programs", []):
+                program = P2PProgram.from_dict(stored)
+                self.programs[program.program_id] = program
+            self.suspended = data.get("suspended", False)
+        self._async_compile()
+
+    @callback
+    def async_stop(self) -> None:
+        """Disarm the timer."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+    @callback
+    def async_suspend(self) -> None:
+        """Stop starting programs until resumed, also across restarts.
+
+        Runs already handed to the run queue are left to the caller.
+        """
+        self.suspended = True
+        self._async_changed()
+
+    @callback
+    def async_resume(self) -> None:
+        """Start programs again from their next start time."""
+        if self.suspended:
+            self.suspended = False
+            self._async_changed()
+
+    @callback
+    def async_set_program(self, program: P2PProgram) -> None:
+        """Add or replace a program, disabling it ends a run in progress."""
+        self.programs[program.program_id] = program
+        if not program.enabled:
+            self._async_cancel_runs(program.program_id)
+        self._async_changed()
+
+    @callback
+    def async_remove_program(self, program_id: str) -> P2PProgram | None:
+        """Remove a program, a run in progress is stopped straight away."""
+        program = self.programs.pop(program_id, None)
+        if program is not None:
+            self._async_cancel_runs(program_id)
+            self._async_changed()
+        return program
+
+    @callback
+    def _async_cancel_runs(self, program_id: str) -> None:
+        for run in (*self.sequencer.queued, *self.sequencer.running):
+            if run.program_id == program_id:
+                self.hass.async_create_task(self.sequencer.async_cancel(run.run_id))
+
+    @callback
+    def _async_changed(self) -> None:
+        """Persist the programs and rebuild the heap."""
+        self._store.async_delay_save(self._data_to_save)
+        self._async_compile()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "programs": [program.as_dict() for program in self.programs.values()],
+            "suspended": self.suspended,
+        }
+
+    @callback
+    def _async_compile(self) -> None:
+        """Queue the next start of every program."""
+        now = dt_util.utcnow()
+        self._heap = []
+        if not self.suspended:
+            for program in self.programs.values():
+                if (start := program.next_start(now)) is not None:
+                    self._heap.append((start, next(self._sequence), program.program_id))
+        heapq.heapify(self._heap)
+        self._async_arm()
+
+    @callback
+    def _async_arm(self) -> None:
+        """Arm the single timer for the earliest start."""
+        self.async_stop()
+        if self._heap:
+            self._unsub_timer = async_track_point_in_utc_time(
+                self.hass, self._async_fire, self._heap[0][0]
+            )
+
+    @callback
+    def _async_fire(self, now: datetime) -> None:
+        """Hand every due start to the run queue, then re-arm for the next one."""
+        self._unsub_timer = None
+        while self._heap and self._heap[0][0] <= now:
+            when, _, program_id = heapq.heappop(self._heap)
+            program = self.programs.get(program_id)
+            if program is None or not program.enabled:
+                continue
+            if (start := program.next_start(when)) is not None:
+                heapq.heappush(self._heap, (start, next(self._sequence), program_id))
+            self.sequencer.async_queue(
+                P2PRun(
+                    serial_number=program.serial_number,
+                    zone=program.zone,
+                    duration=program.duration,
+                    program_id=program_id,
+                )
+            )
+        self._async_arm()
@@ -2,17 +2,23 @@
 
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import (
+    DOMAIN as SENSOR_DOMAIN,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, PERCENTAGE
+from homeassistant.const import CONF_HOST, PERCENTAGE, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .const import CONF_SERIAL_NUMBER
 from .coordinator import P2PDataUpdateCoordinator
-from .entity import P2PEntity
-from .P2PDevice import P2PStatusResponse, P2PZone
+from .entity import P2PEntity, async_remove_stale_entities
+from .p2p import P2PStatus, P2PZone
+from .runtime import RUNTIME_PERIODS
 
 
 async def async_setup_entry(
@@ -21,10 +27,71 @@ async def async_setup_entry(
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up P2P sensor based on a config entry."""
-    coordinator = entry.runtime_data
+    coordinator: P2PDataUpdateCoordinator = entry.runtime_data
 
-    async_add_entities([P2PEcoModeFactor(coordinator)])
-    async_add_entities([P2PZoneSensor(coordinator, index) for index in range(8)])
+    entities: list[P2PEntity] = []
+    if coordinator.compact:
+        entities.append(P2PController(coordinator))
+    else:
+        entities.append(P2PEcoModeFactor(coordinator))
+    for index in coordinator.zones:
+        entities.append(P2PZoneSensor(coordinator, index))
+        entities.extend(
+            P2PZoneRuntime(coordinator, index, period) for period in RUNTIME_PERIODS
+        )
+
+    async_remove_stale_entities(
+        hass, entry, SENSOR_DOMAIN, (entity.unique_id for entity in entities)
+    )
+    async_add_entities(entities)
+
+
+class P2PController(P2PEntity, SensorEntity):
+    """P2P controller status packed into one entity, for compact mode.
+
+    The state is the actual_output mask, bit 0 being zone 1, and the other
+    masks and controller flags are attributes.
+    """
+
+    _attr_icon = "mdi:sprinkler-variant"
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator: P2PDataUpdateCoordinator) -> None:
+        """Initializes the Sensor."""
+        super().__init__(coordinator)
+        # Setup unique ID for this entity
+        if self.coordinator.config_entry is not None:
+            serial_number: str = self.coordinator.config_entry.data[CONF_SERIAL_NUMBER]
+            self._attr_unique_id = f"{serial_number}_controller"
+            self._attr_name = "Controller"
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the mask of zones watering."""
+        if self.coordinator.data is not None and self.coordinator.data["status"]:
+            status_response: P2PStatus = self.coordinator.data["status"]
+            return status_response.actual_output
+        return None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the packed zone masks and controller flags."""
+        result: dict[str, Any] = {}
+
+        if self.coordinator.data is not None and self.coordinator.data["status"]:
+            status_response: P2PStatus = self.coordinator.data["status"]
+            result = {
+                "manual_mode_zones": status_response.manual_mode_zones_active,
+                "auto_mode_zones": status_response.auto_mode_zones,
+                "eco_mode_zones": status_response.eco_mode_zones,
+                "sleep_mode_zones": status_response.sleep_mode_zones,
+                "auto_mode": status_response.system_auto,
+                "eco_mode": status_response.eco_mode,
+                "eco_mode_factor": status_response.eco_mode_factor,
+            }
+        if stale := super().extra_state_attributes:
+            result.update(stale)
+        return result
 
 
 class P2PEcoModeFactor(P2PEntity, SensorEntity):
@@ -32,6 +99,8 @@ class P2PEcoModeFactor(P2PEntity, SensorEntity):
 
     _attr_icon = "mdi:water-percent"
     _attr_has_entity_name = True
+    # Only changed by hand on the controller, a minute's lag is fine
+    _write_interval = 60
 
     def __init__(self, coordinator: P2PDataUpdateCoordinator) -> None:
         """Initializes the Switch."""
@@ -45,12 +114,14 @@ class P2PEcoModeFactor(P2PEntity, SensorEntity):
 
     @callback
     def _handle_coordinator_update(self) -> None:
+        if not self._async_status_changed():
+            return
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 self._attr_native_value = status_response.eco_mode_factor
 
-        self.async_write_ha_state()
+        self._async_write_state()
 
 
 class P2PZoneSensor(P2PEntity, BinarySensorEntity):
@@ -58,6 +129,8 @@ class P2PZoneSensor(P2PEntity, BinarySensorEntity):
 
     _attr_icon = "mdi:sprinkler"
     _attr_has_entity_name = True
+    # Already recorded as the state of the zone's manual mode switch
+    _unrecorded_attributes = P2PEntity._unrecorded_attributes | {"manual_mode_active"}
     index: int
 
     def __init__(self, coordinator: P2PDataUpdateCoordinator, index: int) -> None:
@@ -73,13 +146,15 @@ class P2PZoneSensor(P2PEntity, BinarySensorEntity):
 
     @callback
     def _handle_coordinator_update(self) -> None:
+        if not self._async_status_changed():
+            return
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 zone: P2PZone = status_response.zones[self.index]
                 self._attr_is_on = zone.on
 
-        self.async_write_ha_state()
+        self._async_write_state()
 
 
     @property
@@ -90,11 +165,56 @@ class P2PZoneSensor(P2PEntity, BinarySensorEntity):
 
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 zone: P2PZone = status_response.zones[self.index]
                 result = {
                     "manual_mode_active": zone.manual_mode_active,
                     "eco_mode_active": zone.eco_mode_active,
                     # "sleep_mode_active": zone.sleep_mode_active,
                 }
+        if stale := super().extra_state_attributes:
+            result.update(stale)
         return result
+
+
+class P2PZoneRuntime(P2PEntity, SensorEntity):
+    """P2P zone watering time for the current day or month."""
+
+    _attr_icon = "mdi:timer-outline"
+    _attr_has_entity_name = True
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    # Grows by a tenth of a minute every few polls while the zone waters
+    _write_interval = 60
+    index: int
+    period: str
+
+    def __init__(
+        self, coordinator: P2PDataUpdateCoordinator, index: int, period: str
+    ) -> None:
+        """Initializes the Sensor."""
+        super().__init__(coordinator)
+        # Setup unique ID for this entity
+        if self.coordinator.config_entry is not None:
+            serial_number: str = self.coordinator.config_entry.data[CONF_SERIAL_NUMBER]
+            self._attr_unique_id = f"{serial_number}_zone_runtime_{period}_{index:02d}"
+            self._attr_name = (
+                f"Zone {(index + 1):02d} Runtime {RUNTIME_PERIODS[period]}"
+            )
+
+        # Daily totals are the common case, monthly ones are opt-in
+        self._attr_entity_registry_enabled_default = period == "today"
+        self.index = index
+        self.period = period
+
+    @property
+    def native_value(self) -> float:
+        """Return the accumulated watering minutes."""
+        return self.coordinator.runtime.minutes(self.index, self.period)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # The totals grow while a zone waters, without the status changing
+        if self._async_status_changed(self.native_value):
+            self._async_write_state()
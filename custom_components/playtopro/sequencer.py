@@ -0,0 +1,487 @@
+"""Zone run queue that keeps concurrent watering within supply capacity."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
+import heapq
+import itertools
+from typing import TYPE_CHECKING, Any
+import uuid
+
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_MAX_RUNNING_ZONES,
+    CONF_SERIAL_NUMBER,
+    CONF_SITE_MAX_RUNNING_ZONES,
+    DOMAIN,
+    LOGGER,
+    ZONE_COUNT,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import P2PDataUpdateCoordinator
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.runs"
+
+# How long a started zone may take to show up in actual_output
+VERIFY_GRACE = 15
+
+# Seconds between attempts to stop a zone the controller has not confirmed off
+STOP_RETRY_DELAY = 30
+
+DEFAULT_PRIORITY = 5
+
+
+@dataclass(slots=True)
+class P2PRun:
+    """A request to water one zone for a number of minutes."""
+
+    serial_number: int
+    zone: int
+    duration: int
+    priority: int = DEFAULT_PRIORITY
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    queued: datetime = field(default_factory=dt_util.utcnow)
+    started: datetime | None = None
+    ends: datetime | None = None
+    # Set for runs started by a local program
+    program_id: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> P2PRun:
+        """Restore a stored run."""
+        return cls(
+            serial_number=data["serial_number"],
+            zone=data["zone"] - 1,
+            duration=data["duration"],
+            priority=data["priority"],
+            run_id=data["run_id"],
+            queued=datetime.fromisoformat(data["queued"]),
+            started=_parse_time(data["started"]),
+            ends=_parse_time(data["ends"]),
+            program_id=data.get("program_id"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the run as plain values."""
+        return {
+            "run_id": self.run_id,
+            "serial_number": self.serial_number,
+            "zone": self.zone + 1,
+            "duration": self.duration,
+            "priority": self.priority,
+            "queued": self.queued.isoformat(),
+            "started": self.started.isoformat() if self.started else None,
+            "ends": self.ends.isoformat() if self.ends else None,
+            "program_id": self.program_id,
+        }
+
+
+def _parse_time(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+class P2PRunSequencer:
+    """Starts queued zone runs as capacity allows, highest priority first.
+
+    A zone counts against the limits if the controller reports it in
+    actual_output or a run of ours holds it, so zones started by the
+    controller's own schedule or by hand are respected too. Runs in progress
+    are stored, so a zone left open across a restart is still turned off.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the sequencer."""
+        self.hass = hass
+        # (priority, sequence, run), lower priority values start first
+        self._queue: list[tuple[int, int, P2PRun]] = []
+        self._sequence = itertools.count()
+        self._running: dict[str, P2PRun] = {}
+        self._unsub_stop: dict[str, CALLBACK_TYPE] = {}
+        # serial -> the coordinator followed and its listener removal
+        self._unsub_listeners: dict[
+            int, tuple[P2PDataUpdateCoordinator, CALLBACK_TYPE]
+        ] = {}
+        self._starting: set[tuple[int, int]] = set()
+        # Runs whose stop is on its way
+        self._stopping: set[str] = set()
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # Bumped by async_clear, starts still in flight from before are undone
+        self._generation = 0
+
+    async def async_load(self) -> None:
+        """Restore the runs that were in progress when Home Assistant stopped.
+
+        Each is stopped at its end time, or as soon as its controller is
+        loaded if the end passed while Home Assistant was down.
+        """
+        if (data := await self._store.async_load()) is None:
+            return
+        for stored in data.get("running", []):
+            run = P2PRun.from_dict(stored)
+            self._running[run.run_id] = run
+            self._async_arm_stop(run)
+
+    @callback
+    def async_controller_loaded(self, coordinator: P2PDataUpdateCoordinator) -> None:
+        """Follow a newly set up coordinator and catch up on its runs.
+
+        Runs that ended while the controller was not loaded are stopped now,
+        the others have their stop timed again.
+        """
+        serial_number = int(coordinator.config_entry.data[CONF_SERIAL_NUMBER])
+        self._async_listen(serial_number, coordinator)
+        now = dt_util.utcnow()
+        for run in list(self._running.values()):
+            if run.serial_number != serial_number or run.run_id in self._unsub_stop:
+                continue
+            if run.ends is not None and run.ends > now:
+                self._async_arm_stop(run)
+            else:
+                LOGGER.info(
+                    "Stopping zone %s on %s, run %s ended while it was not loaded",
+                    run.zone + 1,
+                    serial_number,
+                    run.run_id,
+                )
+                self.hass.async_create_task(self._async_finish(run, coordinator))
+
+    @property
+    def queued(self) -> list[P2PRun]:
+        """Return the waiting runs in start order."""
+        return [run for _, _, run in sorted(self._queue)]
+
+    @property
+    def running(self) -> list[P2PRun]:
+        """Return the runs in progress."""
+        return list(self._running.values())
+
+    @callback
+    def async_queue(self, run: P2PRun) -> None:
+        """Queue a run and start whatever now fits."""
+        heapq.heappush(self._queue, (run.priority, next(self._sequence), run))
+        self._async_track()
+        self._async_dispatch()
+
+    async def async_cancel(self, run_id: str) -> bool:
+        """Drop a queued run or stop one in progress."""
+        for index, (_, _, run) in enumerate(self._queue):
+            if run.run_id == run_id:
+                self._queue.pop(index)
+                heapq.heapify(self._queue)
+                self._async_track()
+                return True
+        if (run := self._running.get(run_id)) is not None:
+            await self._async_finish(run)
+            return True
+        return False
+
+    @callback
+    def async_clear(self) -> int:
+        """Drop every run, queued or running, and return how many there were.
+
+        Zones of running runs are left as they are, this is for callers that
+        turn them off themselves.
+        """
+        count = len(self._queue) + len(self._running) + len(self._starting)
+        self._generation += 1
+        self.async_shutdown()
+        self._running.clear()
+        self._queue.clear()
+        self._async_save()
+        return count
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Cancel the timers and listeners.
+
+        Runs are kept, and picked up again by async_controller_loaded.
+        """
+        for unsub in self._unsub_stop.values():
+            unsub()
+        for _, unsub in self._unsub_listeners.values():
+            unsub()
+        self._unsub_stop.clear()
+        self._unsub_listeners.clear()
+
+    def can_start(self, coordinator: P2PDataUpdateCoordinator, zone: int) -> bool:
+        """Return True if one more zone fits on this controller and the site."""
+        serial_number = int(coordinator.config_entry.data[CONF_SERIAL_NUMBER])
+        if self._active_mask(serial_number, coordinator) >> zone & 0x01:
+            # Already on, turning it on again adds nothing
+            return True
+        return self._has_capacity(serial_number, coordinator)
+
+    def _entries(self) -> list[ConfigEntry]:
+        return [
+            entry
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.state is ConfigEntryState.LOADED
+        ]
+
+    def _site_limit(self) -> int:
+        """Return the strictest site limit configured on any controller."""
+        limits = [
+            limit
+            for entry in self._entries()
+            if (limit := entry.options.get(CONF_SITE_MAX_RUNNING_ZONES, 0)) > 0
+        ]
+        return min(limits, default=0)
+
+    def _active_mask(
+        self, serial_number: int, coordinator: P2PDataUpdateCoordinator
+    ) -> int:
+        """Return the zones on, or about to be on, for a controller."""
+        mask = 0
+        if (status := coordinator.status_response) is not None:
+            mask = status.actual_output
+        for run in self._running.values():
+            if run.serial_number == serial_number:
+                mask |= 1 << run.zone
+        for starting_serial, zone in self._starting:
+            if starting_serial == serial_number:
+                mask |= 1 << zone
+        return mask
+
+    def _has_capacity(
+        self, serial_number: int, coordinator: P2PDataUpdateCoordinator
+    ) -> bool:
+        controller_limit: int = coordinator.config_entry.options.get(
+            CONF_MAX_RUNNING_ZONES, ZONE_COUNT
+        )
+        active = self._active_mask(serial_number, coordinator)
+        if active.bit_count() >= controller_limit:
+            return False
+
+        if (site_limit := self._site_limit()) > 0:
+            site = sum(
+                self._active_mask(
+                    int(entry.data[CONF_SERIAL_NUMBER]), entry.runtime_data
+                ).bit_count()
+                for entry in self._entries()
+            )
+            if site >= site_limit:
+                return False
+        return True
+
+    def _coordinator(self, serial_number: int) -> P2PDataUpdateCoordinator | None:
+        entry = self.hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, str(serial_number)
+        )
+        if entry is None or entry.state is not ConfigEntryState.LOADED:
+            return None
+        return entry.runtime_data
+
+    @callback
+    def _async_dispatch(self) -> None:
+        """Start queued runs in priority order while capacity remains.
+
+        A run blocked by its controller's limit does not hold up runs for
+        other controllers further down the queue.
+        """
+        blocked: list[tuple[int, int, P2PRun]] = []
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            run = item[2]
+            coordinator = self._coordinator(run.serial_number)
+            if coordinator is None or not coordinator.device_present:
+                blocked.append(item)
+                continue
+            key = (run.serial_number, run.zone)
+            if key in self._starting or any(
+                (other.serial_number, other.zone) == key
+                for other in self._running.values()
+            ):
+                # The zone is busy with another of our runs
+                blocked.append(item)
+                continue
+            if not self._has_capacity(run.serial_number, coordinator):
+                blocked.append(item)
+                continue
+
+            self._starting.add(key)
+            self.hass.async_create_task(
+                self._async_start(coordinator, run), f"playtopro run {run.run_id}"
+            )
+
+        for item in blocked:
+            heapq.heappush(self._queue, item)
+
+    async def _async_start(
+        self, coordinator: P2PDataUpdateCoordinator, run: P2PRun
+    ) -> None:
+        """Turn a zone on and time its stop."""
+        key = (run.serial_number, run.zone)
+        generation = self._generation
+        try:
+            result = await coordinator.async_set_zone_manual_mode(run.zone, True)
+        except UpdateFailed as err:
+            LOGGER.warning("Run %s could not start, requeued: %s", run.run_id, err)
+            result = None
+        finally:
+            self._starting.discard(key)
+
+        if generation != self._generation:
+            # Cleared while the start was on its way, the zone must stay off
+            if result:
+                await self._async_stop_zone(coordinator, run)
+            return
+        if not result:
+            if result is False:
+                LOGGER.warning(
+                    "Controller %s refused run %s", run.serial_number, run.run_id
+                )
+            # Retried on the next update from the controller
+            heapq.heappush(self._queue, (run.priority, next(self._sequence), run))
+            return
+
+        run.started = dt_util.utcnow()
+        run.ends = run.started + timedelta(minutes=run.duration)
+        self._running[run.run_id] = run
+        self._async_arm_stop(run)
+        self._async_save()
+
+    @callback
+    def _async_arm_stop(self, run: P2PRun) -> None:
+        """Time the stop of a running run."""
+        assert run.ends is not None
+        delay = max((run.ends - dt_util.utcnow()).total_seconds(), 0)
+        self._unsub_stop[run.run_id] = async_call_later(
+            self.hass, delay, partial(self._async_run_elapsed, run)
+        )
+
+    @callback
+    def _async_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"running": [run.as_dict() for run in self._running.values()]}
+
+    @callback
+    def _async_run_elapsed(self, run: P2PRun, _now: datetime) -> None:
+        self.hass.async_create_task(self._async_finish(run))
+
+    @callback
+    def _async_track(self) -> None:
+        """Follow the updates of every controller with queued or running runs."""
+        wanted = {run.serial_number for _, _, run in self._queue}
+        wanted.update(run.serial_number for run in self._running.values())
+
+        for serial_number in set(self._unsub_listeners) - wanted:
+            self._unsub_listeners.pop(serial_number)[1]()
+        for serial_number in wanted:
+            if (coordinator := self._coordinator(serial_number)) is not None:
+                self._async_listen(serial_number, coordinator)
+
+    @callback
+    def _async_listen(
+        self, serial_number: int, coordinator: P2PDataUpdateCoordinator
+    ) -> None:
+        """Follow a controller's updates, moving over when its entry reloads."""
+        if (current := self._unsub_listeners.get(serial_number)) is not None:
+            if current[0] is coordinator:
+                return
+            current[1]()
+        self._unsub_listeners[serial_number] = (
+            coordinator,
+            coordinator.async_add_listener(
+                partial(self._async_verify, serial_number)
+            ),
+        )
+
+    @callback
+    def _async_verify(self, serial_number: int) -> None:
+        """Check our runs against what the controller reports as watering."""
+        coordinator = self._coordinator(serial_number)
+        if coordinator is None or (status := coordinator.status_response) is None:
+            return
+
+        now = dt_util.utcnow()
+        for run in list(self._running.values()):
+            if run.serial_number != serial_number or run.started is None:
+                continue
+            if status.actual_output >> run.zone & 0x01:
+                continue
+            if (now - run.started).total_seconds() < VERIFY_GRACE:
+                continue
+            # Stopped by hand, by the controller or never came on
+            LOGGER.warning(
+                "Zone %s on %s is not watering, ending run %s",
+                run.zone + 1,
+                serial_number,
+                run.run_id,
+            )
+            self.hass.async_create_task(self._async_finish(run))
+
+        # A fresh actual_output may have freed room for queued runs
+        self._async_dispatch()
+
+    async def _async_finish(
+        self, run: P2PRun, coordinator: P2PDataUpdateCoordinator | None = None
+    ) -> None:
+        """Turn a zone off, release its slot and start the next runs."""
+        if run.run_id not in self._running or run.run_id in self._stopping:
+            return
+        if (unsub := self._unsub_stop.pop(run.run_id, None)) is not None:
+            unsub()
+        if coordinator is None:
+            coordinator = self._coordinator(run.serial_number)
+        if coordinator is None:
+            # Kept, and stopped once the controller is loaded again
+            LOGGER.warning(
+                "Controller %s is not loaded, zone %s is stopped once it is",
+                run.serial_number,
+                run.zone + 1,
+            )
+            return
+
+        self._stopping.add(run.run_id)
+        try:
+            stopped = await self._async_stop_zone(coordinator, run)
+        finally:
+            self._stopping.discard(run.run_id)
+        if not stopped:
+            # Still holds the zone, retried until the controller confirms
+            if run.run_id in self._running and run.run_id not in self._unsub_stop:
+                self._unsub_stop[run.run_id] = async_call_later(
+                    self.hass,
+                    STOP_RETRY_DELAY,
+                    partial(self._async_run_elapsed, run),
+                )
+            return
+
+        if self._running.pop(run.run_id, None) is not None:
+            self._async_save()
+        self._async_track()
+        self._async_dispatch()
+
+    async def _async_stop_zone(
+        self, coordinator: P2PDataUpdateCoordinator, run: P2PRun
+    ) -> bool:
+        """Turn the zone of a run off, returning True once confirmed."""
+        try:
+            if await coordinator.async_set_zone_manual_mode(run.zone, False):
+                return True
+            LOGGER.error(
+                "Controller %s refused to stop zone %s",
+                run.serial_number,
+                run.zone + 1,
+            )
+        except UpdateFailed as err:
+            LOGGER.error(
+                "Unable to stop zone %s on %s: %s",
+                run.zone + 1,
+                run.serial_number,
+                err,
+            )
+        return False
@@ -0,0 +1,481 @@
+"""Services for the lichen playtopro integration."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_CONFIG_ENTRY_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import (
+    CONF_SERIAL_NUMBER,
+    DATA_SCHEDULER,
+    DATA_SEQUENCER,
+    DOMAIN,
+    LOGGER,
+    ZONE_COUNT,
+)
+from .coordinator import P2PDataUpdateCoordinator
+from .p2p import P2PError, P2PStatus, P2PStatusResponse
+from .P2PTrace import async_replay
+from .profiler import OUTPUT_FILE, OUTPUT_LOG, P2PProfiler
+from .schedule import WEEKDAYS, P2PProgram, P2PScheduler
+from .sequencer import DEFAULT_PRIORITY, P2PRun, P2PRunSequencer
+
+SERVICE_REPLAY_TRACE = "replay_trace"
+SERVICE_PROFILE = "profile"
+SERVICE_STOP_ALL = "stop_all"
+SERVICE_SET_PROGRAM = "set_program"
+SERVICE_REMOVE_PROGRAM = "remove_program"
+SERVICE_LIST_PROGRAMS = "list_programs"
+SERVICE_RESUME_PROGRAMS = "resume_programs"
+SERVICE_QUEUE_RUN = "queue_run"
+SERVICE_CANCEL_RUN = "cancel_run"
+SERVICE_LIST_RUNS = "list_runs"
+SERVICE_SET_MODE = "set_mode"
+
+ATTR_PATH = "path"
+ATTR_SPEED = "speed"
+ATTR_UPDATE_ENTITIES = "update_entities"
+ATTR_DURATION = "duration"
+ATTR_OUTPUT = "output"
+ATTR_SAMPLE = "sample"
+ATTR_CONCURRENCY = "concurrency"
+ATTR_TIMEOUT = "timeout"
+ATTR_PROGRAM_ID = "program_id"
+ATTR_ZONE = "zone"
+ATTR_START_TIME = "start_time"
+ATTR_WEEKDAYS = "weekdays"
+ATTR_ENABLED = "enabled"
+ATTR_RUN_ID = "run_id"
+ATTR_PRIORITY = "priority"
+ATTR_MODE = "mode"
+ATTR_STATE = "state"
+
+MODE_MANUAL = "manual"
+MODE_AUTO = "auto"
+MODE_ECO = "eco"
+MODE_SLEEP = "sleep"
+# Modes that exist for the whole controller as well as per zone
+CONTROLLER_MODES = (MODE_AUTO, MODE_ECO)
+
+STOP_ALL_CONCURRENCY = 16
+STOP_ALL_TIMEOUT = 5.0
+
+REPLAY_TRACE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_SPEED, default=1.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(ATTR_UPDATE_ENTITIES, default=False): cv.boolean,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+        vol.Optional(ATTR_OUTPUT, default=OUTPUT_LOG): vol.In(
+            [OUTPUT_LOG, OUTPUT_FILE]
+        ),
+        vol.Optional(ATTR_SAMPLE, default=False): cv.boolean,
+    }
+)
+
+STOP_ALL_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONCURRENCY, default=STOP_ALL_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=256)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=STOP_ALL_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=0.5, max=60)
+        ),
+    }
+)
+
+SET_PROGRAM_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_PROGRAM_ID): cv.string,
+        vol.Required(ATTR_ZONE): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=ZONE_COUNT)
+        ),
+        vol.Required(ATTR_START_TIME): cv.time,
+        vol.Required(ATTR_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=720)
+        ),
+        vol.Optional(ATTR_WEEKDAYS, default=list(WEEKDAYS)): vol.All(
+            cv.ensure_list, [vol.In(WEEKDAYS)]
+        ),
+        vol.Optional(ATTR_ENABLED, default=True): cv.boolean,
+    }
+)
+
+REMOVE_PROGRAM_SCHEMA = vol.Schema({vol.Required(ATTR_PROGRAM_ID): cv.string})
+
+QUEUE_RUN_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_ZONE): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=ZONE_COUNT)
+        ),
+        vol.Required(ATTR_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=720)
+        ),
+        vol.Optional(ATTR_PRIORITY, default=DEFAULT_PRIORITY): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=10)
+        ),
+    }
+)
+
+CANCEL_RUN_SCHEMA = vol.Schema({vol.Required(ATTR_RUN_ID): cv.string})
+
+SET_MODE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_MODE): vol.In([MODE_MANUAL, MODE_AUTO, MODE_ECO, MODE_SLEEP]),
+        vol.Optional(ATTR_ZONE): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=ZONE_COUNT)
+        ),
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+
+
+@callback
+def async_get_coordinator(
+    hass: HomeAssistant, entry_id: str
+) -> P2PDataUpdateCoordinator:
+    """Return the coordinator of a loaded playtopro entry."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Unknown playtopro entry: {entry_id}")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Entry {entry.title} is not loaded")
+    return entry.runtime_data
+
+
+async def _async_replay_trace(call: ServiceCall) -> ServiceResponse:
+    """Replay a recorded frame trace through the response parsers."""
+    hass = call.hass
+    coordinator = async_get_coordinator(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+
+    path = call.data.get(ATTR_PATH, coordinator.trace_path)
+    if not hass.config.is_allowed_path(path):
+        raise ServiceValidationError(f"Access to {path} is not allowed")
+    if not await hass.async_add_executor_job(Path(path).is_file):
+        raise ServiceValidationError(f"No trace found at {path}")
+
+    @callback
+    def _async_on_status(status: P2PStatusResponse) -> None:
+        coordinator.async_set_status(P2PStatus.from_response(status))
+
+    try:
+        report = await async_replay(
+            path,
+            call.data[ATTR_SPEED],
+            _async_on_status if call.data[ATTR_UPDATE_ENTITIES] else None,
+        )
+    except P2PError as err:
+        raise ServiceValidationError(err.error) from err
+
+    return {"path": path, **report.as_dict()}
+
+
+async def _async_profile(call: ServiceCall) -> None:
+    """Time the coordinator and entity hot paths of one entry for a while."""
+    coordinator = async_get_coordinator(call.hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    if coordinator.profiler is not None:
+        raise ServiceValidationError("A profile is already running for this entry")
+
+    profiler = P2PProfiler(
+        call.hass,
+        coordinator,
+        output=call.data[ATTR_OUTPUT],
+        sample=call.data[ATTR_SAMPLE],
+    )
+    try:
+        profiler.async_start(call.data[ATTR_DURATION])
+    except ValueError as err:
+        # cProfile refuses to run alongside another active profiler
+        raise ServiceValidationError(f"Unable to start profiling: {err}") from err
+    coordinator.profiler = profiler
+
+
+async def _async_stop_all(call: ServiceCall) -> ServiceResponse:
+    """Turn off every zone and auto mode on all loaded controllers at once.
+
+    Queued runs are dropped and local programs suspended first, so nothing
+    of ours reopens a zone behind the stop.
+    """
+    hass = call.hass
+    semaphore = asyncio.Semaphore(call.data[ATTR_CONCURRENCY])
+    timeout: float = call.data[ATTR_TIMEOUT]
+
+    sequencer: P2PRunSequencer = hass.data[DOMAIN][DATA_SEQUENCER]
+    scheduler: P2PScheduler = hass.data[DOMAIN][DATA_SCHEDULER]
+    runs_cleared = sequencer.async_clear()
+    scheduler.async_suspend()
+
+    async def _async_stop(coordinator: P2PDataUpdateCoordinator) -> dict[str, Any]:
+        error: str | None = None
+        async with semaphore:
+            # The deadline and timing start once a worker is free, so a
+            # controller waiting its turn is not reported as timed out
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    success = await coordinator.async_stop_all()
+            except TimeoutError:
+                success, error = False, "Timed out"
+            except UpdateFailed as err:
+                success, error = False, str(err)
+            except P2PError as err:
+                success, error = False, err.error
+            except Exception as err:
+                # One controller failing oddly must not lose the other results
+                LOGGER.exception(
+                    "Unexpected error stopping %s", coordinator.config_entry.title
+                )
+                success, error = False, repr(err)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return {
+            "title": coordinator.config_entry.title,
+            "success": success,
+            "error": error,
+            "elapsed_ms": elapsed_ms,
+        }
+
+    entries = [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    ]
+    results = await asyncio.gather(
+        *(_async_stop(entry.runtime_data) for entry in entries)
+    )
+
+    devices = {
+        str(entry.data[CONF_SERIAL_NUMBER]): result
+        for entry, result in zip(entries, results, strict=True)
+    }
+    failed = [serial for serial, result in devices.items() if not result["success"]]
+    if failed:
+        LOGGER.error("Stop all failed on %s", ", ".join(failed))
+    return {"devices": devices, "runs_cleared": runs_cleared}
+
+
+def _program_response(program: P2PProgram) -> dict[str, Any]:
+    """Return a program in the shape the program services accept."""
+    return {
+        ATTR_PROGRAM_ID: program.program_id,
+        "serial_number": program.serial_number,
+        ATTR_ZONE: program.zone + 1,
+        ATTR_START_TIME: program.start.isoformat(),
+        ATTR_DURATION: program.duration,
+        ATTR_WEEKDAYS: [WEEKDAYS[day] for day in program.weekdays],
+        ATTR_ENABLED: program.enabled,
+    }
+
+
+async def _async_set_program(call: ServiceCall) -> ServiceResponse:
+    """Add or update a local watering program."""
+    scheduler: P2PScheduler = call.hass.data[DOMAIN][DATA_SCHEDULER]
+    entry = call.hass.config_entries.async_get_entry(call.data[ATTR_CONFIG_ENTRY_ID])
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(
+            f"Unknown playtopro entry: {call.data[ATTR_CONFIG_ENTRY_ID]}"
+        )
+
+    program = P2PProgram(
+        serial_number=int(entry.data[CONF_SERIAL_NUMBER]),
+        zone=call.data[ATTR_ZONE] - 1,
+        start=call.data[ATTR_START_TIME],
+        duration=call.data[ATTR_DURATION],
+        weekdays=sorted(
+            {WEEKDAYS.index(day) for day in call.data[ATTR_WEEKDAYS] or WEEKDAYS}
+        ),
+        enabled=call.data[ATTR_ENABLED],
+    )
+    if ATTR_PROGRAM_ID in call.data:
+        if call.data[ATTR_PROGRAM_ID] not in scheduler.programs:
+            raise ServiceValidationError(
+                f"Unknown program: {call.data[ATTR_PROGRAM_ID]}"
+            )
+        program.program_id = call.data[ATTR_PROGRAM_ID]
+
+    scheduler.async_set_program(program)
+    return _program_response(program)
+
+
+async def _async_remove_program(call: ServiceCall) -> None:
+    """Remove a local watering program."""
+    scheduler: P2PScheduler = call.hass.data[DOMAIN][DATA_SCHEDULER]
+    if scheduler.async_remove_program(call.data[ATTR_PROGRAM_ID]) is None:
+        raise ServiceValidationError(f"Unknown program: {call.data[ATTR_PROGRAM_ID]}")
+
+
+async def _async_list_programs(call: ServiceCall) -> ServiceResponse:
+    """Return every local watering program."""
+    scheduler: P2PScheduler = call.hass.data[DOMAIN][DATA_SCHEDULER]
+    return {
+        "programs": [
+            _program_response(program) for program in scheduler.programs.values()
+        ],
+        "suspended": scheduler.suspended,
+    }
+
+
+async def _async_resume_programs(call: ServiceCall) -> None:
+    """Let local programs start again after an emergency stop."""
+    scheduler: P2PScheduler = call.hass.data[DOMAIN][DATA_SCHEDULER]
+    scheduler.async_resume()
+
+
+async def _async_queue_run(call: ServiceCall) -> ServiceResponse:
+    """Queue a zone run, it starts as soon as supply capacity allows."""
+    coordinator = async_get_coordinator(call.hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    sequencer: P2PRunSequencer = call.hass.data[DOMAIN][DATA_SEQUENCER]
+
+    run = P2PRun(
+        serial_number=int(coordinator.config_entry.data[CONF_SERIAL_NUMBER]),
+        zone=call.data[ATTR_ZONE] - 1,
+        duration=call.data[ATTR_DURATION],
+        priority=call.data[ATTR_PRIORITY],
+    )
+    sequencer.async_queue(run)
+    return run.as_dict()
+
+
+async def _async_cancel_run(call: ServiceCall) -> None:
+    """Drop a queued run or stop one in progress."""
+    sequencer: P2PRunSequencer = call.hass.data[DOMAIN][DATA_SEQUENCER]
+    if not await sequencer.async_cancel(call.data[ATTR_RUN_ID]):
+        raise ServiceValidationError(f"Unknown run: {call.data[ATTR_RUN_ID]}")
+
+
+async def _async_list_runs(call: ServiceCall) -> ServiceResponse:
+    """Return the running and queued zone runs."""
+    sequencer: P2PRunSequencer = call.hass.data[DOMAIN][DATA_SEQUENCER]
+    return {
+        "running": [run.as_dict() for run in sequencer.running],
+        "queued": [run.as_dict() for run in sequencer.queued],
+    }
+
+
+async def _async_set_mode(call: ServiceCall) -> None:
+    """Switch a zone or controller mode, for entries without the switches."""
+    coordinator = async_get_coordinator(call.hass, call.data[ATTR_CONFIG_ENTRY_ID])
+    mode: str = call.data[ATTR_MODE]
+    state: bool = call.data[ATTR_STATE]
+
+    if ATTR_ZONE not in call.data:
+        if mode not in CONTROLLER_MODES:
+            raise ServiceValidationError(f"A zone is required for {mode} mode")
+        if mode == MODE_AUTO:
+            result = await coordinator.async_set_auto_mode(state)
+        else:
+            result = await coordinator.async_set_eco_mode(state)
+    else:
+        zone: int = call.data[ATTR_ZONE] - 1
+        if mode == MODE_MANUAL:
+            sequencer: P2PRunSequencer = call.hass.data[DOMAIN][DATA_SEQUENCER]
+            if state and not sequencer.can_start(coordinator, zone):
+                raise ServiceValidationError(
+                    f"Zone {(zone + 1):02d} can't start, the maximum number "
+                    "of zones is already running"
+                )
+            result = await coordinator.async_set_zone_manual_mode(zone, state)
+        elif mode == MODE_AUTO:
+            result = await coordinator.async_set_zone_auto_mode(zone, state)
+        elif mode == MODE_ECO:
+            result = await coordinator.async_set_zone_eco_mode(zone, state)
+        else:
+            result = await coordinator.async_set_zone_sleep_mode(zone, state)
+
+    if not result:
+        raise ServiceValidationError(
+            f"{coordinator.config_entry.title} refused to set {mode} mode"
+        )
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_TRACE,
+        _async_replay_trace,
+        schema=REPLAY_TRACE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_ALL,
+        _async_stop_all,
+        schema=STOP_ALL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_PROGRAM,
+        _async_set_program,
+        schema=SET_PROGRAM_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REMOVE_PROGRAM,
+        _async_remove_program,
+        schema=REMOVE_PROGRAM_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LIST_PROGRAMS,
+        _async_list_programs,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESUME_PROGRAMS, _async_resume_programs
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUEUE_RUN,
+        _async_queue_run,
+        schema=QUEUE_RUN_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CANCEL_RUN, _async_cancel_run, schema=CANCEL_RUN_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LIST_RUNS,
+        _async_list_runs,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_MODE, _async_set_mode, schema=SET_MODE_SCHEMA
+    )
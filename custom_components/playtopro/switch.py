@@ -2,15 +2,17 @@
 
 from typing import Any
 
-from homeassistant.components.switch import SwitchEntity
+from homeassistant.components.switch import DOMAIN as SWITCH_DOMAIN, SwitchEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .coordinator import P2PDataUpdateCoordinator
-from .entity import P2PEntity
-from .P2PDevice import P2PStatusResponse, P2PZone
-from .const import CONF_SERIAL_NUMBER
+from .entity import P2PEntity, async_remove_stale_entities
+from .p2p import P2PStatus, P2PZone
+from .const import CONF_SERIAL_NUMBER, DATA_SEQUENCER, DOMAIN
+from .sequencer import P2PRunSequencer
 
 
 async def async_setup_entry(
@@ -19,14 +21,23 @@ async def async_setup_entry(
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up P2P switch based on a config entry."""
-    coordinator = entry.runtime_data
+    coordinator: P2PDataUpdateCoordinator = entry.runtime_data
 
-    async_add_entities([P2PZoneManualMode(coordinator, index) for index in range(8)])
-    async_add_entities([P2PAutoMode(coordinator)])
-    async_add_entities([P2PZoneAutoMode(coordinator, index) for index in range(8)])
-    async_add_entities([P2PEcoMode(coordinator)])
-    async_add_entities([P2PZoneEcoMode(coordinator, index) for index in range(8)])
-    async_add_entities([P2PZoneSleepMode(coordinator, index) for index in range(8)])
+    entities: list[P2PEntity] = []
+    if not coordinator.compact:
+        # Set through the set_mode service in compact mode
+        entities.extend((P2PAutoMode(coordinator), P2PEcoMode(coordinator)))
+    for index in coordinator.zones:
+        entities.append(P2PZoneManualMode(coordinator, index))
+        if coordinator.zone_mode_switches:
+            entities.append(P2PZoneAutoMode(coordinator, index))
+            entities.append(P2PZoneEcoMode(coordinator, index))
+            entities.append(P2PZoneSleepMode(coordinator, index))
+
+    async_remove_stale_entities(
+        hass, entry, SWITCH_DOMAIN, (entity.unique_id for entity in entities)
+    )
+    async_add_entities(entities)
 
 
 class P2PZoneManualMode(P2PEntity, SwitchEntity):
@@ -47,22 +58,23 @@ class P2PZoneManualMode(P2PEntity, SwitchEntity):
 
         self.index = index
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-
     @property
     def is_on(self) -> bool | None:
         """Return true if device is on."""
         if self.coordinator.data is not None:
-            status_response: P2PStatusResponse = self.coordinator.data["status"]
+            status_response: P2PStatus = self.coordinator.data["status"]
             zone: P2PZone = status_response.zones[self.index]
             return zone.manual_mode_active
         return None
 
     async def async_turn_on(self, **kwargs: Any) -> None:
-        """Turn zone on."""
+        """Turn zone on, unless supply capacity is already used up."""
+        sequencer: P2PRunSequencer = self.hass.data[DOMAIN][DATA_SEQUENCER]
+        if not sequencer.can_start(self.coordinator, self.index):
+            raise ServiceValidationError(
+                f"Zone {(self.index + 1):02d} can't start, the maximum number "
+                "of zones is already running"
+            )
         await self.coordinator.async_set_zone_manual_mode(self.index, True)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
@@ -85,17 +97,12 @@ class P2PAutoMode(P2PEntity, SwitchEntity):
             self._attr_unique_id = f"{serial_number}_auto_mode"
             self._attr_name = "Auto Mode"
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-
     @property
     def is_on(self) -> bool | None:
         """Return true if device is configured to run it's internal schedule."""
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 return status_response.system_auto
         return None
 
@@ -128,17 +135,12 @@ class P2PZoneAutoMode(P2PEntity, SwitchEntity):
 
         self.index = index
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-
     @property
     def is_on(self) -> bool | None:
         """Return true if device is on."""
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 return status_response.zones[self.index].auto_mode
         return None
 
@@ -167,17 +169,12 @@ class P2PEcoMode(P2PEntity, SwitchEntity):
 
             self._attr_name = "Eco Mode"
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-
     @property
     def is_on(self) -> bool | None:
         """Return true if device eco mode is on."""
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 return status_response.eco_mode
         return None
 
@@ -208,17 +205,12 @@ class P2PZoneEcoMode(P2PEntity, SwitchEntity):
             self._attr_name = f"Zone {(index + 1):02d} Eco Mode"
         self.index = index
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-
     @property
     def is_on(self) -> bool | None:
         """Return true if zone eco mode is on."""
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 return status_response.zones[self.index].eco_mode
         return None
 
@@ -248,16 +240,12 @@ class P2PZoneSleepMode(P2PEntity, SwitchEntity):
             self._attr_name = f"Zone {(index + 1):02d} Sleep Mode"
         self.index = index
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
     @property
     def is_on(self) -> bool | None:
         """Return true if zone sleep mode is on."""
         if self.coordinator.data is not None:
             if self.coordinator.data["status"]:
-                status_response: P2PStatusResponse = self.coordinator.data["status"]
+                status_response: P2PStatus = self.coordinator.data["status"]
                 return status_response.zones[self.index].sleep_mode
         return None
 
@@ -0,0 +1,150 @@
+"""Fail when importing the integration gets slower than a budget.
+
+Each run imports the integration and its platforms in a fresh interpreter,
+after the Home Assistant modules that are already loaded by the time an
+integration is set up, so only the integration's own cost is measured. The
+median of the runs is compared to the budget.
+
+Run from the repository root with Home Assistant installed:
+
+    python scripts/import_budget.py --budget-ms 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+
+INTEGRATION = "custom_components.playtopro"
+MODULES = (INTEGRATION, f"{INTEGRATION}.sensor", f"{INTEGRATION}.switch")
+
+# Loaded by Home Assistant before it sets up this integration
+BASELINE = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.binary_sensor",
+    "homeassistant.components.sensor",
+    "homeassistant.components.switch",
+    "homeassistant.components.zeroconf",
+)
+
+# Must only be imported when they are used, not when the integration loads.
+# The coordinator, sequencer and the rest of the integration's own modules
+# are imported by __init__ and entity, so they are not on this list
+LAZY = (
+    f"{INTEGRATION}.frontend",
+    "homeassistant.components.lovelace",
+    "cProfile",
+    "pstats",
+)
+
+CHILD = """
+import importlib, json, sys, time
+for name in {baseline!r}:
+    importlib.import_module(name)
+started = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure() -> dict[str, object]:
+    """Import the integration once in a fresh interpreter."""
+    code = CHILD.format(baseline=BASELINE, modules=MODULES, lazy=LAZY)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def breakdown(top: int) -> str:
+    """Return the slowest modules the integration imports, from -X importtime."""
+    code = "import importlib\n" + "".join(
+        f"importlib.import_module({name!r})\n" for name in (*BASELINE, *MODULES)
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    seen: set[str] = set()
+    rows: list[tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit() or name in seen:
+            continue
+        seen.add(name)
+        rows.append((int(cumulative), name))
+    # Only what gets imported after the baseline is this integration's doing
+    first = max(
+        (index + 1 for index, (_, name) in enumerate(rows) if name in BASELINE),
+        default=0,
+    )
+    slowest = sorted(rows[first:], reverse=True)[:top]
+    return "\n".join(f"{micros / 1000:9.1f} ms  {name}" for micros, name in slowest)
+
+
+def main() -> int:
+    """Measure, report and compare against the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=250.0,
+        help="median import time allowed (default %(default)s)",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=7, help="imports measured (default %(default)s)"
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="slowest modules listed on failure"
+    )
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    times = sorted(float(run["ms"]) for run in runs)
+    median = statistics.median(times)
+    print(
+        f"{INTEGRATION} import: median {median:.1f} ms, "
+        f"min {times[0]:.1f} ms, max {times[-1]:.1f} ms over {len(times)} runs "
+        f"(budget {args.budget_ms:.0f} ms)"
+    )
+
+    failed = False
+    if loaded := sorted({name for run in runs for name in run["loaded"]}):
+        print(f"Imported eagerly but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"Over budget by {median - args.budget_ms:.1f} ms, slowest imports:")
+        print(breakdown(args.top))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())